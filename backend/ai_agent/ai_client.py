@@ -2,16 +2,19 @@
 import json
 import re
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from server.settings import GENAI_API_KEY, GENAI_MODEL
+from django.conf import settings
 
 
 class PracticeGenerator:
     def __init__(self):
+        # Imported here: langchain pulls in grpc/protobuf, which every worker
+        # and manage.py command would otherwise pay for at startup.
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
         self.llm = ChatGoogleGenerativeAI(
-            model=GENAI_MODEL,
+            model=settings.GENAI_MODEL,
             temperature=0.7,
-            api_key=GENAI_API_KEY,
+            api_key=settings.GENAI_API_KEY,
         )
     
     def _get_json_group(self, raw_json: str):
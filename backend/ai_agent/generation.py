@@ -0,0 +1,45 @@
+from django.conf import settings
+
+from ai_agent.models import GenerationPrompt
+from api.models import PracticeTemplate
+from api.similarity import ModelIndex
+
+
+prompt_index = ModelIndex(
+    lambda: GenerationPrompt.objects.only('id', 'prompt', 'created_at'),
+    text_of=lambda generation: generation.prompt,
+)
+
+
+def generate_practice_list(user, message):
+    """Practices for ``message``, reusing an earlier generation for a near-identical prompt.
+
+    Returns ``(practices, reused)``.
+    """
+    prompt_index.sync()
+    match = prompt_index.best(message, settings.PROMPT_REUSE_THRESHOLD)
+    if match:
+        previous = GenerationPrompt.objects.filter(pk=match[0]).first()
+        if previous is not None:
+            return previous.practices, True
+
+    from ai_agent.ai_client import PracticeGenerator
+
+    practices = PracticeGenerator().generate_practices(message)
+    if practices:
+        generation = GenerationPrompt.objects.create(user=user, prompt=message, practices=practices)
+        prompt_index.add_object(generation)
+    return practices, False
+
+
+def save_generated_practices(user, practices):
+    created = []
+    for p in practices:
+        obj = PracticeTemplate.objects.create(
+            user=user,
+            title=p.get("title", "Untitled"),
+            description=p.get("description", ""),
+            default_duration_sec=p.get("default_duration_sec", 60),
+        )
+        created.append(obj)
+    return created
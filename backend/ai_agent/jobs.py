@@ -0,0 +1,10 @@
+from ai_agent.generation import generate_practice_list, save_generated_practices
+from api.serializers import PracticeTemplateSerializer
+from jobs.queue import job
+
+
+@job("generate_practices")
+def generate_practices(job):
+    practices, _ = generate_practice_list(job.user, job.payload["message"])
+    created = save_generated_practices(job.user, practices)
+    return PracticeTemplateSerializer(created, many=True).data
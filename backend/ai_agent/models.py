@@ -1 +1,21 @@
-from django.db import models
\ No newline at end of file
+from django.conf import settings
+from django.db import models
+import uuid
+
+
+class GenerationPrompt(models.Model):
+    """A prompt sent to the LLM and the practices it returned, kept for reuse."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="generation_prompts"
+    )
+    prompt = models.TextField()
+    practices = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.prompt[:50]
@@ -1,33 +1,32 @@
 # views.py
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from api.models import PracticeTemplate
 from api.serializers import PracticeTemplateSerializer
-from ai_agent.ai_client import PracticeGenerator
+from api.throttling import GenerateRateThrottle
+from api.idempotency import idempotent
+from ai_agent.generation import generate_practice_list, save_generated_practices
+from jobs.queue import enqueue
+from jobs.serializers import JobSerializer
 
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@throttle_classes([GenerateRateThrottle])
+@idempotent
 def generate_practices_view(request):
     user_input = request.data.get("message", "")
 
     if not user_input:
         return Response({"error": "message field is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-    generator = PracticeGenerator()
-    practices = generator.generate_practices(user_input)
+    if request.data.get("async"):
+        job = enqueue("generate_practices", {"message": user_input}, user=request.user)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 
-    created = []
-    for p in practices:
-        obj = PracticeTemplate.objects.create(
-            user=request.user,
-            title=p.get("title", "Untitled"),
-            description=p.get("description", ""),
-            default_duration_sec=p.get("default_duration_sec", 60),
-        )
-        created.append(obj)
+    practices, _ = generate_practice_list(request.user, user_input)
+    created = save_generated_practices(request.user, practices)
 
     serializer = PracticeTemplateSerializer(created, many=True)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib import admin
-from .models import User,PracticeTemplate, DayPlan, Slot, Rating
+from .models import User,PracticeTemplate, DayPlan, Slot, Rating, CohortSummary
 # Register your models here.
 
 admin.site.register(User)
@@ -8,3 +8,4 @@ admin.site.register(PracticeTemplate)
 admin.site.register(DayPlan)
 admin.site.register(Slot)
 admin.site.register(Rating)
+admin.site.register(CohortSummary)
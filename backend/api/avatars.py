@@ -0,0 +1,84 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from api.models import User
+
+logger = logging.getLogger(__name__)
+
+AVATAR_SIZES = (64, 128, 256)
+AVATAR_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.AVATAR_WORKERS, thread_name_prefix='avatar')
+    return _executor
+
+
+def build_variants(source):
+    """Square, metadata-free thumbnails of ``source`` saved under content-hash names.
+
+    Returns ``{'webp': {'64': name, ...}, 'jpeg': {...}}`` with storage names.
+    """
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+    variants = {ext: {} for ext in AVATAR_FORMATS}
+    for size in AVATAR_SIZES:
+        thumb = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        for ext, fmt in AVATAR_FORMATS.items():
+            buffer = BytesIO()
+            # Pixels only: nothing from the upload's EXIF/ICC/XMP is carried over.
+            thumb.save(buffer, fmt, quality=85)
+            data = buffer.getvalue()
+            digest = hashlib.sha256(data).hexdigest()[:16]
+            name = f'avatars/variants/{digest}-{size}.{ext}'
+            if not default_storage.exists(name):
+                name = default_storage.save(name, ContentFile(data))
+            variants[ext][str(size)] = name
+    return variants
+
+
+def process_avatar(user_id):
+    user = User.objects.filter(pk=user_id).only('avatar', 'avatar_variants').first()
+    if user is None or not user.avatar:
+        return
+    if user.avatar_variants.get('source') == user.avatar.name:
+        return
+
+    try:
+        with user.avatar.open('rb') as source:
+            variants = build_variants(source)
+    except Exception as exc:
+        # Record the failure against this upload so later saves don't queue it again.
+        logger.exception('Building avatar variants failed for user %s (%s)', user_id, user.avatar.name)
+        variants = {'error': f'{type(exc).__name__}: {exc}'}
+    variants['source'] = user.avatar.name
+    # Skip the write if another upload replaced the avatar meanwhile.
+    User.objects.filter(pk=user_id, avatar=user.avatar.name).update(avatar_variants=variants)
+
+
+def _process_in_worker(user_id):
+    try:
+        process_avatar(user_id)
+    except Exception:
+        logger.exception('Avatar processing failed for user %s', user_id)
+    finally:
+        connection.close()
+
+
+def schedule_avatar_processing(user):
+    """Queue variant generation for ``user`` once the current transaction commits."""
+    transaction.on_commit(lambda: get_executor().submit(_process_in_worker, user.pk))
@@ -0,0 +1,12 @@
+from django.db.models import OuterRef, Subquery
+
+
+def fill_rating_users(apps, schema_editor):
+    """RunPython step for the migration that adds Rating.user to a database with ratings.
+
+    See "Upgrading" in the README: add the column nullable, run this, then make it NOT NULL.
+    """
+    Rating = apps.get_model('api', 'Rating')
+    Slot = apps.get_model('api', 'Slot')
+    owner = Slot.objects.filter(pk=OuterRef('slot_id')).values('user_id')[:1]
+    Rating.objects.filter(user__isnull=True).update(user=Subquery(owner))
@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Lower, Trim
+from django.utils import timezone
+
+from api.models import CohortSummary, Rating, Slot, SummaryWatermark, rating_score
+
+
+WATERMARK = 'cohorts'
+METRICS = ('mood', 'ease', 'satisfaction', 'nervousness')
+GROUPINGS = {
+    CohortSummary.Dimension.TITLE: Lower(Trim('slot__user_practice__title')),
+    CohortSummary.Dimension.TIME_OF_DAY: F('slot__time_of_day'),
+}
+
+
+def refresh(full=False):
+    """Fold ratings made since the last refresh into CohortSummary.
+
+    Ratings newer than COHORT_REFRESH_LAG are left for the next run so that
+    rows committed slightly out of order are not skipped. Returns the number
+    of ratings folded in. Edits and deletes of folded ratings are applied as
+    they happen (see ``replace``); ``full`` rebuilds from scratch.
+    """
+    until = timezone.now() - timedelta(seconds=settings.COHORT_REFRESH_LAG)
+    with transaction.atomic():
+        watermark, _ = SummaryWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+        if full:
+            CohortSummary.objects.all().delete()
+            watermark.rated_until = None
+
+        ratings = Rating.objects.filter(rated_at_utc__lte=until)
+        if watermark.rated_until is not None:
+            ratings = ratings.filter(rated_at_utc__gt=watermark.rated_until)
+
+        rows = _group(ratings, GROUPINGS)
+        _apply(rows)
+        folded = sum(row['count'] for row in rows if row['dimension'] == CohortSummary.Dimension.TIME_OF_DAY)
+
+        watermark.rated_until = until
+        watermark.save()
+    return folded
+
+
+def _group(ratings, dimensions):
+    rows = []
+    for dimension in dimensions:
+        grouped = ratings
+        if dimension == CohortSummary.Dimension.TITLE:
+            grouped = grouped.exclude(slot__user_practice__isnull=True)
+        rows.extend(
+            {'dimension': dimension, **row} for row in
+            grouped.values(key=GROUPINGS[dimension], variant=F('slot__variant'))
+            .annotate(count=Count('id'), **{f'{m}_sum': Sum(m) for m in METRICS})
+        )
+    return rows
+
+
+def _apply(rows, sign=1):
+    for row in rows:
+        totals = {field: sign * row[field] for field in ('count', *(f'{m}_sum' for m in METRICS))}
+        updated = CohortSummary.objects.filter(
+            dimension=row['dimension'], key=row['key'], variant=row['variant'],
+        ).update(**{field: F(field) + value for field, value in totals.items()})
+        if not updated and sign > 0:
+            CohortSummary.objects.create(
+                dimension=row['dimension'], key=row['key'], variant=row['variant'], **totals)
+
+
+def folded(ratings, dimensions=tuple(GROUPINGS)):
+    """What ``ratings`` currently contribute to the summaries, for ``replace``.
+
+    Only ratings up to the watermark have been folded in; later ones are read
+    with their current values by the next refresh, so they contribute nothing yet.
+    """
+    watermark = SummaryWatermark.objects.filter(name=WATERMARK).values_list('rated_until', flat=True).first()
+    if watermark is None:
+        return []
+    return _group(ratings.filter(rated_at_utc__lte=watermark), dimensions)
+
+
+def replace(old_rows, new_rows=()):
+    """Swap a change's old contribution for its new one (``folded`` before and after the write)."""
+    if not old_rows and not new_rows:
+        return
+    with transaction.atomic():
+        _apply(old_rows, -1)
+        _apply(new_rows)
+
+
+def _means(summary):
+    if summary is None or not summary.count:
+        return None
+    means = {m: getattr(summary, f'{m}_sum') / summary.count for m in METRICS}
+    means['score'] = rating_score(**means)
+    return {'count': summary.count, **means}
+
+
+def report(dimension, min_count=1):
+    """DO vs CONTROL means and deltas per key, best delta first."""
+    by_key = {}
+    for summary in CohortSummary.objects.filter(dimension=dimension):
+        by_key.setdefault(summary.key, {})[summary.variant] = summary
+
+    rows = []
+    for key, variants in by_key.items():
+        do = _means(variants.get(Slot.Variant.DO))
+        control = _means(variants.get(Slot.Variant.CONTROL))
+        if do is None or do['count'] < min_count:
+            continue
+        delta = None
+        if do and control and control['count'] >= min_count:
+            delta = {m: do[m] - control[m] for m in (*METRICS, 'score')}
+        rows.append({'key': key, 'do': do, 'control': control, 'delta': delta})
+    rows.sort(key=lambda row: (row['delta'] is None, -(row['delta'] or {}).get('score', 0)))
+    return rows
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from api.models import Slot
+from api.realtime import broker, ensure_pg_listener, slot_state
+
+
+def _sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def _remaining(state, now):
+    """Timer for an IN_PROGRESS slot, or None if it was never started (e.g. status set by PATCH)."""
+    if not state['started_at_utc']:
+        return None
+    started = parse_datetime(state['started_at_utc'])
+    elapsed = (now - started).total_seconds()
+    remaining = (state['duration_sec_snapshot'] or 0) - elapsed
+    return {'id': state['id'], 'elapsed_sec': int(elapsed), 'remaining_sec': max(int(remaining), 0)}
+
+
+def _authenticate(request):
+    """JWT from the Authorization header, or ``?token=`` since EventSource can't set headers."""
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw = auth.get_raw_token(header) if header else request.GET.get('token')
+    if not raw:
+        return None
+    return auth.get_user(auth.get_validated_token(raw))
+
+
+def _active_slots(user):
+    qs = Slot.objects.filter(user=user, status=Slot.Status.IN_PROGRESS)
+    return [slot_state(slot) for slot in qs]
+
+
+async def _stream(user):
+    subscription = broker.subscribe(user.pk)
+    _, queue = subscription
+    try:
+        active = {state['id']: state for state in await sync_to_async(_active_slots)(user)}
+        yield _sse('snapshot', {'active': list(active.values())})
+
+        last_sent = time.monotonic()
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), settings.REALTIME_TICK_SEC)
+            except asyncio.TimeoutError:
+                event = None
+
+            if event is not None:
+                state = event['slot']
+                if state['status'] == Slot.Status.IN_PROGRESS:
+                    active[state['id']] = state
+                else:
+                    active.pop(state['id'], None)
+                yield _sse('slot', event)
+            elif active:
+                now = timezone.now()
+                timers = [_remaining(state, now) for state in active.values()]
+                yield _sse('tick', {'timers': [timer for timer in timers if timer is not None]})
+            elif time.monotonic() - last_sent >= settings.REALTIME_KEEPALIVE_SEC:
+                # Comment line keeps proxies from closing an idle stream.
+                yield ': keepalive\n\n'
+            else:
+                continue
+            last_sent = time.monotonic()
+    finally:
+        broker.unsubscribe(user.pk, subscription)
+
+
+async def slot_events_view(request):
+    """Server-sent events: slot status changes and once-a-second timer ticks.
+
+    Only served under ASGI (``uvicorn server.asgi:application``): a WSGI server
+    buffers the endless stream and never sends a byte, pinning a worker.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'Slot events need the ASGI server (server.asgi:application).'},
+                            status=501)
+    try:
+        user = await sync_to_async(_authenticate)(request)
+    except (InvalidToken, AuthenticationFailed):
+        user = None
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    await sync_to_async(ensure_pg_listener)()
+    response = StreamingHttpResponse(_stream(user), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
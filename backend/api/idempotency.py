@@ -0,0 +1,118 @@
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from api.models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+POLL_INTERVAL = 0.1
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def _replay(record):
+    response = Response(record.response_body, status=record.response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _claim(request, key, fingerprint):
+    """Create the IN_FLIGHT record for this key.
+
+    Returns ``(record, True)`` when this request owns the key, or the existing
+    live record and False. An IN_FLIGHT record older than
+    IDEMPOTENCY_IN_FLIGHT_TIMEOUT belongs to a request whose worker died, so
+    it is taken over like an expired one.
+    """
+    while True:
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user=request.user,
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+                )
+            return record, True
+        except IntegrityError:
+            record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+            if record is None:
+                continue
+            now = timezone.now()
+            abandoned = (record.state == IdempotencyKey.State.IN_FLIGHT
+                         and record.created_at <= now - timedelta(seconds=settings.IDEMPOTENCY_IN_FLIGHT_TIMEOUT))
+            if record.expires_at <= now or abandoned:
+                # Conditional on the row we saw, so only one duplicate takes over.
+                IdempotencyKey.objects.filter(pk=record.pk, state=record.state).delete()
+                continue
+            return record, False
+
+
+def idempotent(view):
+    """Replay the first response for a repeated ``Idempotency-Key`` instead of redoing the work.
+
+    Works on function views and viewset methods. A duplicate that arrives while
+    the first request is still running waits for its result (up to
+    IDEMPOTENCY_WAIT_SEC). Server errors are not stored, so the client may retry.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        request = args[0] if isinstance(args[0], Request) else args[1]
+        key = request.headers.get(HEADER)
+        if not key or not request.user.is_authenticated:
+            return view(*args, **kwargs)
+        if len(key) > 255:
+            return Response({'detail': f'{HEADER} is too long'}, status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = _fingerprint(request)
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SEC
+        while True:
+            record, claimed = _claim(request, key, fingerprint)
+            if claimed:
+                break
+            if record.fingerprint != fingerprint:
+                return Response({'detail': f'{HEADER} was already used for a different request'},
+                                status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if record.state == IdempotencyKey.State.DONE:
+                return _replay(record)
+            if time.monotonic() >= deadline:
+                return Response({'detail': 'A request with this key is still in progress'},
+                                status=status.HTTP_409_CONFLICT)
+            time.sleep(POLL_INTERVAL)
+
+        # By pk: if this request outlived its lease, the key now belongs to a retry.
+        owned = IdempotencyKey.objects.filter(pk=record.pk)
+        try:
+            response = view(*args, **kwargs)
+        except BaseException:
+            owned.delete()
+            raise
+
+        if response.status_code >= 500:
+            owned.delete()
+        else:
+            owned.update(
+                state=IdempotencyKey.State.DONE,
+                response_status=response.status_code,
+                response_body=response.data,
+            )
+        return response
+    return wrapper
+
+
+def purge_expired():
+    return IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()[0]
@@ -0,0 +1,19 @@
+from api import cohorts
+from api.idempotency import purge_expired
+from api.sweeper import sweep_missed_slots
+from jobs.queue import job
+
+
+@job("sweep_missed_slots")
+def sweep(job):
+    return {"swept": sweep_missed_slots()}
+
+
+@job("refresh_cohort_summaries")
+def refresh_cohorts(job):
+    return {"folded": cohorts.refresh(full=job.payload.get("full", False))}
+
+
+@job("purge_idempotency_keys")
+def purge_idempotency_keys(job):
+    return {"deleted": purge_expired()}
@@ -0,0 +1,102 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.models import DayPlan, PracticeTemplate, Rating, Slot, User
+
+
+# Indexes declared in Meta for the hot query shapes; --without-indexes drops them
+HOT_INDEXES = [
+    'practice_user_created', 'practice_user_selected', 'practice_created',
+    'slot_user_plan_scheduled', 'slot_user_scheduled', 'slot_planned_scheduled',
+    'rating_user_rated', 'rating_rated',
+]
+
+
+def _is_test_database():
+    if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+        return True
+    return str(connection.settings_dict['NAME']).startswith('test_')
+
+
+class Command(BaseCommand):
+    help = ("Seed a synthetic dataset inside a rolled-back transaction and time the hot queries. "
+            "Nothing is kept, but the inserts hold write locks until the end, so don't point it at production.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--days', type=int, default=200)
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--without-indexes', action='store_true',
+                            help="Drop the hot-path indexes first to get 'before' numbers (test databases only)")
+
+    def handle(self, *args, users, days, runs, without_indexes, **options):
+        if without_indexes and not _is_test_database():
+            # DROP INDEX inside the transaction locks the tables exclusively until it ends.
+            raise CommandError("--without-indexes only runs against a test database")
+        with transaction.atomic():
+            target, day_plan = self._seed(users, days)
+            if without_indexes:
+                with connection.cursor() as cursor:
+                    for name in HOT_INDEXES:
+                        cursor.execute(f'DROP INDEX {name}')
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+
+            cutoff = timezone.now() - timedelta(hours=2)
+            queries = {
+                'slots of a day plan': Slot.objects.filter(user=target, day_plan=day_plan),
+                'user slots by time': Slot.objects.filter(user=target).order_by('scheduled_at_utc'),
+                'selected practices': PracticeTemplate.objects.filter(
+                    user=target, is_selected=True).order_by('-created_at'),
+                'ratings via slot__user': Rating.objects.filter(slot__user=target),
+                'ratings via user': Rating.objects.filter(user=target).order_by('rated_at_utc'),
+                'overdue planned slots': Slot.objects.filter(
+                    status=Slot.Status.PLANNED, scheduled_at_utc__lt=cutoff),
+            }
+            for name, queryset in queries.items():
+                timings = []
+                for _ in range(runs):
+                    started = time.perf_counter()
+                    list(queryset.all())
+                    timings.append(time.perf_counter() - started)
+                plan = ' | '.join(line.strip() for line in queryset.explain().splitlines())
+                self.stdout.write(f"{name:<24} {statistics.median(timings) * 1000:8.2f} ms   {plan[:110]}")
+
+            transaction.set_rollback(True)
+
+    def _seed(self, n_users, days):
+        rng = random.Random(0)
+        now = timezone.now()
+        users = User.objects.bulk_create([User(username=f'bench-{i}-{rng.random()}') for i in range(n_users)])
+        practices = PracticeTemplate.objects.bulk_create([
+            PracticeTemplate(user=user, title=f'Practice {j}', is_selected=j % 3 == 0)
+            for user in users for j in range(30)
+        ])
+        by_user = {}
+        for practice in practices:
+            by_user.setdefault(practice.user_id, []).append(practice)
+
+        plans = DayPlan.objects.bulk_create([
+            DayPlan(user=user, local_date=date(2020, 1, 1) + timedelta(days=d))
+            for user in users for d in range(days)
+        ])
+        slots = Slot.objects.bulk_create([
+            Slot(user_id=plan.user_id, day_plan=plan, user_practice=rng.choice(by_user[plan.user_id]),
+                 time_of_day=tod, status=rng.choice(['DONE', 'DONE', 'MISSED', 'PLANNED']),
+                 variant=rng.choice(['DO', 'CONTROL']),
+                 scheduled_at_utc=now - timedelta(days=(plan.local_date - date(2020, 1, 1)).days, hours=h))
+            for plan in plans for h, tod in enumerate(['MORNING', 'AFTERNOON', 'EVENING'])
+        ], batch_size=2000)
+        Rating.objects.bulk_create([
+            Rating(slot=slot, user_id=slot.user_id, mood=rng.randint(0, 10), ease=rng.randint(0, 10))
+            for slot in slots if slot.status == 'DONE'
+        ], batch_size=2000)
+        self.stdout.write(f"Seeded {len(users)} users, {len(plans)} day plans, {len(slots)} slots")
+        return users[0], plans[days // 2]
@@ -0,0 +1,53 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.similarity import SimilarityIndex
+
+
+WORDS = """
+morning evening walk read write breathe stretch meditate journal sleep water
+drink run yoga plank push squat focus phone screen tea coffee cold shower
+gratitude plan review call family friend cook vegetable fruit sun fresh air
+quiet music draw language study code clean room desk posture eye rest nap
+""".split()
+
+
+def synthetic_text(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))) + f' {rng.randrange(10 ** 6)}'
+
+
+class Command(BaseCommand):
+    help = "Benchmark the near-duplicate index build and lookup on synthetic practice texts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=100000)
+        parser.add_argument('--queries', type=int, default=2000)
+        parser.add_argument('--threshold', type=float, default=0.8)
+
+    def handle(self, *args, size, queries, threshold, **options):
+        rng = random.Random(0)
+        texts = [synthetic_text(rng) for _ in range(size)]
+
+        index = SimilarityIndex()
+        started = time.perf_counter()
+        for key, text in enumerate(texts):
+            index.add(key, text)
+        build = time.perf_counter() - started
+
+        timings = []
+        hits = 0
+        for text in rng.sample(texts, min(queries, size)):
+            started = time.perf_counter()
+            hits += bool(index.best(text, threshold))
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+
+        self.stdout.write(f"Indexed {size} texts in {build:.1f}s")
+        self.stdout.write(
+            f"Lookup over {len(timings)} queries: mean {statistics.mean(timings) * 1e6:.0f} us, "
+            f"p50 {timings[len(timings) // 2] * 1e6:.0f} us, p99 {timings[int(len(timings) * 0.99)] * 1e6:.0f} us, "
+            f"self-hit rate {hits / len(timings):.0%}"
+        )
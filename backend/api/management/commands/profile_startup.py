@@ -0,0 +1,74 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Runs in a fresh interpreter: what a gunicorn worker or manage.py pays before serving.
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({'elapsed': time.perf_counter() - started, 'modules': sorted(sys.modules)}))
+"""
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_importtime(stderr):
+    """-X importtime output as [(module, self_us, cumulative_us)]."""
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            rows.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return rows
+
+
+def measure_startup(importtime=False):
+    """Cold-start Django plus the URLconf in a subprocess and return its timings."""
+    command = [sys.executable, *(['-X', 'importtime'] if importtime else []), '-c', STARTUP_SCRIPT]
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'server.settings')}
+    proc = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise CommandError(proc.stderr[-2000:])
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    if importtime:
+        result['imports'] = parse_importtime(proc.stderr)
+    return result
+
+
+class Command(BaseCommand):
+    help = "Report per-module import time for a cold Django + URLconf startup"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument('--budget-ms', type=float,
+                            help="Exit with an error if startup takes longer than this")
+
+    def handle(self, *args, top, budget_ms, **options):
+        result = measure_startup(importtime=True)
+        imports = result['imports']
+
+        by_package = defaultdict(int)
+        for module, self_us, _ in imports:
+            by_package[module.split('.')[0]] += self_us
+
+        self.stdout.write(f"Startup: {result['elapsed'] * 1000:.0f} ms, {len(result['modules'])} modules loaded\n")
+        self.stdout.write("Top packages (self time, ms):")
+        for package, total in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f"  {total / 1000:8.1f}  {package}")
+        self.stdout.write("\nTop modules (cumulative time, ms):")
+        for module, _, cumulative in sorted(imports, key=lambda row: -row[2])[:top]:
+            self.stdout.write(f"  {cumulative / 1000:8.1f}  {module}")
+
+        if budget_ms is not None and result['elapsed'] * 1000 > budget_ms:
+            raise CommandError(f"Startup took {result['elapsed'] * 1000:.0f} ms, budget is {budget_ms:.0f} ms")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.cohorts import refresh
+
+
+class Command(BaseCommand):
+    help = "Fold new ratings into the cohort analytics summary tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Rebuild the summaries from scratch")
+
+    def handle(self, *args, full, **options):
+        folded = refresh(full=full)
+        self.stdout.write(f"Folded {folded} rating(s) into cohort summaries")
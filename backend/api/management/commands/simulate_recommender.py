@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from api.recommender import simulate
+
+
+class Command(BaseCommand):
+    help = "Offline simulation of the Thompson-sampling practice recommender"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--practices', type=int, default=30)
+        parser.add_argument('--rounds', type=int, default=1000)
+        parser.add_argument('--k', type=int, default=6)
+        parser.add_argument('--noise', type=float, default=0.15)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, practices, rounds, k, noise, seed, **options):
+        result = simulate(practices, rounds, k, noise, seed)
+        self.stdout.write(f"Selection latency: {result['selection_latency_us']:.1f} us per plan")
+        for policy, regret in result['regret'].items():
+            self.stdout.write(f"{policy:>8} cumulative regret: {regret:.1f} ({regret / rounds:.3f}/round)")
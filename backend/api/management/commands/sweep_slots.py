@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.sweeper import sweep_missed_slots
+
+
+class Command(BaseCommand):
+    help = "Mark overdue PLANNED slots as MISSED and notify connected clients"
+
+    def handle(self, *args, **options):
+        swept = sweep_missed_slots()
+        self.stdout.write(f"Marked {swept} slot(s) as MISSED")
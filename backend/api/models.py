@@ -1,4 +1,5 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 import uuid
 # Create your models here.
@@ -6,6 +7,8 @@ import uuid
 class User(AbstractUser):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    # Resized copies of ``avatar``, filled in by api.avatars off the request path
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     groups = models.ManyToManyField(
         'auth.Group',
@@ -35,6 +38,28 @@ class PracticeTemplate(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_selected = models.BooleanField(default=False)
+    # Beta posterior over the practice's rating reward, see api/recommender.py
+    posterior_alpha = models.FloatField(default=1.0, editable=False)
+    posterior_beta = models.FloatField(default=1.0, editable=False)
+    # Earlier practice of the same user with near-identical text, set on insert
+    duplicate_of = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="near_duplicates"
+    )
+
+    class Meta:
+        indexes = [
+            # practices list: user's templates newest first, optionally selected only
+            models.Index(fields=['user', '-created_at'], name='practice_user_created'),
+            models.Index(fields=['user', '-created_at'], condition=models.Q(is_selected=True),
+                         name='practice_user_selected'),
+            # similarity index top-up (created_at >= watermark)
+            models.Index(fields=['created_at'], name='practice_created'),
+        ]
 
     def __str__(self):
         return self.title
@@ -103,14 +128,39 @@ class Slot(models.Model):
 
     class Meta:
         ordering = ["scheduled_at_utc"]
+        indexes = [
+            # slots of a day plan / of a user, both ordered by scheduled time
+            models.Index(fields=['user', 'day_plan', 'scheduled_at_utc'], name='slot_user_plan_scheduled'),
+            models.Index(fields=['user', 'scheduled_at_utc'], name='slot_user_scheduled'),
+            # sweeper: overdue PLANNED slots
+            models.Index(fields=['scheduled_at_utc'], condition=models.Q(status='PLANNED'),
+                         name='slot_planned_scheduled'),
+        ]
 
     def __str__(self):
         return f"{self.user} — {self.time_of_day} — {self.status}"
 
 
+RATING_MAX = 10
+
+
+def rating_score(mood, ease, satisfaction, nervousness):
+    """Combined score in [0, 1] of a rating or of averaged ratings; nervousness counts against it."""
+    total = mood + ease + satisfaction + (RATING_MAX - nervousness)
+    return min(max(total / (4 * RATING_MAX), 0.0), 1.0)
+
+
 class Rating(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     slot = models.OneToOneField(Slot, on_delete=models.CASCADE, related_name="rating")
+    # Copy of slot.user so per-user rating queries skip the join. Set in save();
+    # bulk_create callers must pass user_id themselves.
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        editable=False,
+        related_name="ratings"
+    )
 
     mood = models.PositiveSmallIntegerField(default=0)
     ease = models.PositiveSmallIntegerField(default=0)
@@ -119,7 +169,92 @@ class Rating(models.Model):
 
     rated_at_utc = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # user's ratings by time: rating list, trend buckets
+            models.Index(fields=['user', 'rated_at_utc'], name='rating_user_rated'),
+            # cohort refresh: ratings after the watermark
+            models.Index(fields=['rated_at_utc'], name='rating_rated'),
+        ]
+
+    @property
+    def score(self):
+        return rating_score(self.mood, self.ease, self.satisfaction, self.nervousness)
+
+    def save(self, *args, **kwargs):
+        if Rating.slot.is_cached(self):
+            self.user_id = self.slot.user_id
+        else:
+            self.user_id = Slot.objects.values_list('user_id', flat=True).get(pk=self.slot_id)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Rating for {self.slot_id} ({self.mood}/{self.satisfaction})"
 
 
+
+
+class CohortSummary(models.Model):
+    """Running rating totals across all users, maintained by api.cohorts.refresh."""
+
+    class Dimension(models.TextChoices):
+        TITLE = "TITLE"
+        TIME_OF_DAY = "TIME_OF_DAY"
+
+    dimension = models.CharField(max_length=15, choices=Dimension.choices)
+    key = models.CharField(max_length=255)
+    variant = models.CharField(max_length=10, choices=Slot.Variant.choices)
+
+    count = models.PositiveIntegerField(default=0)
+    mood_sum = models.PositiveBigIntegerField(default=0)
+    ease_sum = models.PositiveBigIntegerField(default=0)
+    satisfaction_sum = models.PositiveBigIntegerField(default=0)
+    nervousness_sum = models.PositiveBigIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key', 'variant'], name='uniq_cohort_summary')
+        ]
+
+    def __str__(self):
+        return f"{self.dimension} {self.key} {self.variant} ({self.count})"
+
+
+class SummaryWatermark(models.Model):
+    """Ratings up to ``rated_until`` are already folded into the summaries named ``name``."""
+    name = models.CharField(max_length=50, unique=True)
+    rated_until = models.DateTimeField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.rated_until}"
+
+
+class IdempotencyKey(models.Model):
+    """First response to a POST carrying an ``Idempotency-Key`` header, see api.idempotency."""
+
+    class State(models.TextChoices):
+        IN_FLIGHT = "IN_FLIGHT"
+        DONE = "DONE"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="idempotency_keys")
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    state = models.CharField(max_length=10, choices=State.choices, default=State.IN_FLIGHT)
+
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='uniq_user_idempotency_key')
+        ]
+
+    def __str__(self):
+        return f"{self.user} — {self.key} ({self.state})"
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+PG_CHANNEL = 'slot_events'
+
+
+class Broker:
+    """In-process fan-out of per-user events to asyncio subscribers.
+
+    ``deliver`` may be called from any thread (request handlers, the sweeper,
+    the LISTEN thread); events are handed to each subscriber's event loop.
+    """
+    queue_size = 100
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = (asyncio.get_running_loop(), asyncio.Queue(self.queue_size))
+        with self._lock:
+            self._subscribers[str(user_id)].add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(str(user_id))
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[str(user_id)]
+
+    def deliver(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(str(user_id), ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_put_dropping_oldest, queue, event)
+
+
+def _put_dropping_oldest(queue, event):
+    # A stalled client must not grow memory without bound.
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+broker = Broker()
+
+
+def use_pg_notify():
+    return settings.REALTIME_PG_NOTIFY and connection.vendor == 'postgresql'
+
+
+def publish(user_id, event):
+    """Send ``event`` to every connection of ``user_id`` in every worker."""
+    if use_pg_notify():
+        message = json.dumps({'user': str(user_id), 'event': event})
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [PG_CHANNEL, message])
+    else:
+        broker.deliver(user_id, event)
+
+
+def slot_state(slot):
+    return {
+        'id': str(slot.id),
+        'status': slot.status,
+        'scheduled_at_utc': slot.scheduled_at_utc.isoformat(),
+        'started_at_utc': slot.started_at_utc.isoformat() if slot.started_at_utc else None,
+        'ended_at_utc': slot.ended_at_utc.isoformat() if slot.ended_at_utc else None,
+        'duration_sec_snapshot': slot.duration_sec_snapshot,
+    }
+
+
+def publish_slot(slot, event_type):
+    """Publish the slot's new state once the surrounding transaction commits."""
+    event = {'type': event_type, 'slot': slot_state(slot)}
+    transaction.on_commit(lambda: publish(slot.user_id, event))
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def ensure_pg_listener():
+    """Start this process's LISTEN thread once, when NOTIFY fan-out is enabled."""
+    global _listener
+    if not use_pg_notify():
+        return
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(target=_listen_forever, name='slot-events-listener', daemon=True)
+            _listener.start()
+
+
+def _listen_forever():
+    import psycopg2
+    from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+    params = connection.get_connection_params()
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(**params)
+            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN {PG_CHANNEL}')
+            while True:
+                if select.select([conn], [], [], 5) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    message = json.loads(notify.payload)
+                    broker.deliver(message['user'], message['event'])
+        except Exception:
+            logger.exception('Slot events listener failed, reconnecting')
+            if conn is not None:
+                conn.close()
+            time.sleep(5)
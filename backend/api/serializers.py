@@ -1,11 +1,26 @@
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 from api.models import User, PracticeTemplate, DayPlan,Slot, Rating
 
 class UserSerializer(serializers.ModelSerializer):
+    avatar_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = User
         fields = '__all__'
 
+    def get_avatar_variants(self, obj):
+        request = self.context.get('request')
+        variants = {}
+        for ext, names in obj.avatar_variants.items():
+            if ext in ('source', 'error'):
+                continue
+            urls = {size: default_storage.url(name) for size, name in names.items()}
+            if request is not None:
+                urls = {size: request.build_absolute_uri(url) for size, url in urls.items()}
+            variants[ext] = urls
+        return variants
+
 class PracticeTemplateSerializer(serializers.ModelSerializer):
     class Meta:
         model = PracticeTemplate
@@ -37,4 +52,47 @@ class RatingSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['id', 'rated_at_utc']
 
-        
+
+class DashboardPracticeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PracticeTemplate
+        fields = ['id', 'title', 'default_duration_sec']
+
+
+class DashboardSlotSerializer(SlotSerializer):
+    """Slot with its practice and rating inlined (expects select_related)."""
+    practice = DashboardPracticeSerializer(source='user_practice', read_only=True)
+    rating = RatingSerializer(read_only=True)
+
+
+class DayPlanDashboardSerializer(serializers.ModelSerializer):
+    """Day plan with nested slots and a summary, built from prefetched slots only."""
+    slots = DashboardSlotSerializer(many=True, read_only=True)
+    summary = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DayPlan
+        fields = ['id', 'local_date', 'timezone', 'created_at', 'slots', 'summary']
+
+    def get_summary(self, obj):
+        slots = obj.slots.all()
+        by_status = {choice: 0 for choice in Slot.Status.values}
+        rated = 0
+        planned_sec = 0
+        done_sec = 0
+        for slot in slots:
+            by_status[slot.status] += 1
+            duration = slot.duration_sec_snapshot or 0
+            planned_sec += duration
+            if slot.status == Slot.Status.DONE:
+                done_sec += duration
+            if hasattr(slot, 'rating'):
+                rated += 1
+        return {
+            'total': len(slots),
+            'by_status': by_status,
+            'rated': rated,
+            'planned_duration_sec': planned_sec,
+            'done_duration_sec': done_sec,
+        }
+
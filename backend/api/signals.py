@@ -0,0 +1,107 @@
+from django.conf import settings
+from django.db.models.signals import post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from api.avatars import schedule_avatar_processing
+from api import cohorts, recommender
+from api.models import CohortSummary, PracticeTemplate, Rating, Slot, User
+from api.similarity import nearest
+
+
+@receiver(post_save, sender=User)
+def refresh_avatar_variants(sender, instance, **kwargs):
+    if not instance.avatar:
+        if instance.avatar_variants:
+            User.objects.filter(pk=instance.pk).update(avatar_variants={})
+        return
+    if instance.avatar_variants.get('source') != instance.avatar.name:
+        schedule_avatar_processing(instance)
+
+
+@receiver(pre_save, sender=Rating)
+def remember_previous_rating(sender, instance, **kwargs):
+    instance._previous = None
+    instance._cohort_rows = []
+    if not instance._state.adding:
+        instance._previous = Rating.objects.select_related('slot').filter(pk=instance.pk).first()
+        instance._cohort_rows = cohorts.folded(Rating.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Rating)
+def update_practice_posterior(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous', None)
+    recommender.record_rating(instance, recommender.contribution(previous) if previous else None)
+
+
+@receiver(post_save, sender=Rating)
+def update_cohort_summaries(sender, instance, created, **kwargs):
+    if not created:
+        cohorts.replace(getattr(instance, '_cohort_rows', []), cohorts.folded(Rating.objects.filter(pk=instance.pk)))
+
+
+@receiver(pre_delete, sender=Rating)
+def retract_rating(sender, instance, **kwargs):
+    recommender.apply_contribution(recommender.contribution(instance), -1)
+    cohorts.replace(cohorts.folded(Rating.objects.filter(pk=instance.pk)))
+
+
+# Slot and practice edits move already-folded ratings between cohort keys.
+
+@receiver(pre_save, sender=Slot)
+def remember_slot_cohort(sender, instance, **kwargs):
+    instance._cohort_rows = []
+    if instance._state.adding:
+        return
+    previous = Slot.objects.filter(pk=instance.pk).values_list('variant', 'time_of_day', 'user_practice_id').first()
+    if previous and previous != (instance.variant, instance.time_of_day, instance.user_practice_id):
+        instance._cohort_rows = cohorts.folded(Rating.objects.filter(slot_id=instance.pk))
+
+
+@receiver(post_save, sender=Slot)
+def update_slot_cohort(sender, instance, created, **kwargs):
+    rows = getattr(instance, '_cohort_rows', [])
+    if rows:
+        cohorts.replace(rows, cohorts.folded(Rating.objects.filter(slot_id=instance.pk)))
+
+
+@receiver(pre_save, sender=PracticeTemplate)
+def remember_practice_cohort(sender, instance, **kwargs):
+    instance._cohort_rows = []
+    if instance._state.adding:
+        return
+    previous = PracticeTemplate.objects.filter(pk=instance.pk).values_list('title', flat=True).first()
+    if previous is not None and previous != instance.title:
+        instance._cohort_rows = cohorts.folded(
+            Rating.objects.filter(slot__user_practice_id=instance.pk), [CohortSummary.Dimension.TITLE])
+
+
+@receiver(post_save, sender=PracticeTemplate)
+def update_practice_cohort(sender, instance, created, **kwargs):
+    rows = getattr(instance, '_cohort_rows', [])
+    if rows:
+        cohorts.replace(rows, cohorts.folded(
+            Rating.objects.filter(slot__user_practice_id=instance.pk), [CohortSummary.Dimension.TITLE]))
+
+
+@receiver(pre_delete, sender=PracticeTemplate)
+def retract_practice_cohort(sender, instance, **kwargs):
+    # Its slots are kept with user_practice set NULL (a bulk update, no signals),
+    # which takes their ratings out of the TITLE dimension.
+    cohorts.replace(cohorts.folded(
+        Rating.objects.filter(slot__user_practice_id=instance.pk), [CohortSummary.Dimension.TITLE]))
+
+
+@receiver(pre_save, sender=PracticeTemplate)
+def flag_near_duplicate(sender, instance, **kwargs):
+    if not instance._state.adding:
+        return
+    # Only the user's own templates count, so compare against just those (indexed by user).
+    own = (PracticeTemplate.objects.filter(user_id=instance.user_id)
+           .order_by('created_at').values_list('id', 'title', 'description'))
+    match = nearest(
+        f'{instance.title} {instance.description}',
+        ((pk, f'{title} {description}') for pk, title, description in own.iterator()),
+        settings.PRACTICE_DUPLICATE_THRESHOLD,
+    )
+    if match:
+        instance.duplicate_of_id = match[0]
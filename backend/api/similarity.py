@@ -0,0 +1,173 @@
+"""Near-duplicate text matching.
+
+Texts are reduced to a set of normalised word tokens and compared with exact
+Jaccard similarity. ``nearest`` scans a short candidate list (a user's own
+practices); ``SimilarityIndex`` is an in-process MinHash + LSH index for a
+large shared corpus, where candidates come from LSH buckets so a lookup
+touches a handful of entries however large the index is.
+"""
+import logging
+import random
+import re
+import threading
+from functools import lru_cache
+from hashlib import blake2b
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+NUM_PERM = 64
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+STOP_WORDS = frozenset("""
+a an and are as at be by for from how i in into is it me my of on or our so
+that the this to want we with you your
+""".split())
+_WORD = re.compile(r'[a-zа-яё0-9]+')
+
+
+def _stem(word):
+    for suffix in ('ing', 'ed', 'es', 's'):
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+@lru_cache(maxsize=20000)
+def tokenize(text):
+    return frozenset(_stem(w) for w in _WORD.findall(text.lower()) if w not in STOP_WORDS)
+
+
+@lru_cache(maxsize=200000)
+def _token_hashes(token):
+    x = int.from_bytes(blake2b(token.encode(), digest_size=8).digest(), 'little')
+    return tuple((a * x + b) % _PRIME for a, b in _PERMUTATIONS)
+
+
+def signature(tokens):
+    return tuple(map(min, zip(*map(_token_hashes, tokens))))
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def nearest(text, candidates, threshold):
+    """Best ``(key, score)`` among ``(key, text)`` candidates with Jaccard >= ``threshold``, or None."""
+    tokens = tokenize(text)
+    if not tokens:
+        return None
+    best = None
+    for key, candidate in candidates:
+        score = jaccard(tokens, tokenize(candidate))
+        if score >= threshold and (best is None or score > best[1]):
+            best = (key, score)
+    return best
+
+
+class SimilarityIndex:
+    def __init__(self):
+        self._tokens = {}
+        self._bands = [{} for _ in range(BANDS)]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def __contains__(self, key):
+        return key in self._tokens
+
+    def add(self, key, text):
+        if key in self._tokens:
+            return
+        tokens = tokenize(text)
+        if not tokens:
+            return
+        sig = signature(tokens)
+        with self._lock:
+            if key in self._tokens:
+                return
+            self._tokens[key] = tokens
+            for band, start in zip(self._bands, range(0, NUM_PERM, ROWS)):
+                band.setdefault(sig[start:start + ROWS], []).append(key)
+
+    def query(self, text, threshold):
+        """Keys of indexed texts with Jaccard >= ``threshold``, best first, as (key, score)."""
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+        sig = signature(tokens)
+        candidates = set()
+        for band, start in zip(self._bands, range(0, NUM_PERM, ROWS)):
+            candidates.update(band.get(sig[start:start + ROWS], ()))
+        matches = []
+        for key in candidates:
+            score = jaccard(tokens, self._tokens[key])
+            if score >= threshold:
+                matches.append((key, score))
+        return sorted(matches, key=lambda match: -match[1])
+
+    def best(self, text, threshold):
+        matches = self.query(text, threshold)
+        return matches[0] if matches else None
+
+
+class ModelIndex(SimilarityIndex):
+    """A SimilarityIndex over a model's rows, loaded in the background and topped up from the DB.
+
+    Each worker keeps its own copy. The first ``sync`` starts the full load in
+    a thread and returns at once (lookups miss until it finishes), so no
+    request pays for it; later calls pull rows created since the previous one
+    (one indexed query), so inserts made by other workers are picked up.
+    """
+    background = True
+
+    def __init__(self, get_queryset, text_of):
+        super().__init__()
+        self.get_queryset = get_queryset
+        self.text_of = text_of
+        self._seen_until = None
+        self._loaded = threading.Event()
+        self._loader = None
+        self._sync_lock = threading.Lock()
+
+    def sync(self):
+        if self._loaded.is_set():
+            self._pull()
+        elif not self.background:
+            self.load()
+        elif self._loader is None or not self._loader.is_alive():
+            self._loader = threading.Thread(target=self._load_in_thread, name='similarity-index-load', daemon=True)
+            self._loader.start()
+
+    def load(self):
+        self._pull()
+        self._loaded.set()
+
+    def _load_in_thread(self):
+        try:
+            self.load()
+        except Exception:
+            logger.exception('Loading the similarity index failed, retrying on next sync')
+        finally:
+            connection.close()
+
+    def _pull(self):
+        with self._sync_lock:
+            qs = self.get_queryset()
+            if self._seen_until is not None:
+                qs = qs.filter(created_at__gte=self._seen_until)
+            for obj in qs.order_by('created_at').iterator(chunk_size=2000):
+                self.add(obj.pk, self.text_of(obj))
+                self._seen_until = obj.created_at
+
+    def add_object(self, obj):
+        self.add(obj.pk, self.text_of(obj))
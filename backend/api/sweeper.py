@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import Slot
+from api.realtime import publish_slot
+
+
+def sweep_missed_slots(now=None):
+    """Mark PLANNED slots that were never started as MISSED. Returns how many were swept."""
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=settings.SLOT_MISSED_AFTER_SEC)
+    with transaction.atomic():
+        slots = list(
+            Slot.objects.select_for_update(skip_locked=True)
+            .filter(status=Slot.Status.PLANNED, scheduled_at_utc__lt=cutoff)
+        )
+        Slot.objects.filter(id__in=[slot.id for slot in slots]).update(
+            status=Slot.Status.MISSED, updated_at=now)
+        for slot in slots:
+            slot.status = Slot.Status.MISSED
+            publish_slot(slot, 'missed')
+    return len(slots)
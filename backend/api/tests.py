@@ -1,15 +1,42 @@
-from django.test import TestCase
-from rest_framework.test import APITestCase
+import asyncio
+import json
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from api.models import User
+from django.utils import timezone
+from PIL import Image
 from rest_framework import status
+from rest_framework.test import APIRequestFactory, APITestCase
 from rest_framework_simplejwt.tokens import RefreshToken
-import uuid
-# Create your tests here.
+
+from api import avatars, cohorts, recommender, throttling
+from api.models import CohortSummary, DayPlan, IdempotencyKey, PracticeTemplate, Rating, Slot, User
+from api.realtime import broker
+from api.serializers import UserSerializer
+from api.similarity import ModelIndex, SimilarityIndex
+from api.sweeper import sweep_missed_slots
+from api.trends import lttb
 
 
 class TestUserAPI(APITestCase):
     def setUp(self):
+        throttling.local_store.clear()
         self.admin_user = User.objects.create_superuser(
             username='admin', password='adminpass')
         refresh = RefreshToken.for_user(self.admin_user)
@@ -78,3 +105,753 @@ class TestUserAPI(APITestCase):
             url_logout,  {"refresh": response.data['refresh']}, format="json")
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TestTodayDashboardAPI(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='dash_user', password='userpass')
+        self.client.force_authenticate(self.user)
+        self.day_plan = DayPlan.objects.create(
+            user=self.user, local_date=date(2025, 1, 10), timezone='Europe/Warsaw')
+        self.url = reverse('day_plan-today')
+
+    def _add_slots(self, count):
+        for i in range(count):
+            practice = PracticeTemplate.objects.create(
+                user=self.user, title=f'Practice {i}', default_duration_sec=300, is_selected=True)
+            slot = Slot.objects.create(
+                user=self.user, day_plan=self.day_plan, user_practice=practice,
+                time_of_day='MORNING', status='DONE' if i % 2 else 'PLANNED',
+                scheduled_at_utc=timezone.now() + timedelta(hours=i),
+                duration_sec_snapshot=300)
+            if i % 2:
+                Rating.objects.create(slot=slot, mood=7, ease=6, satisfaction=8)
+
+    def test_today_returns_nested_plan(self):
+        self._add_slots(2)
+        response = self.client.get(
+            self.url, {'local_date': '2025-01-10', 'timezone': 'Europe/Warsaw'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['slots']), 2)
+        planned, done = response.data['slots']
+        self.assertEqual(planned['practice']['title'], 'Practice 0')
+        self.assertIsNone(planned['rating'])
+        self.assertEqual(done['rating']['mood'], 7)
+        self.assertEqual(response.data['summary']['total'], 2)
+        self.assertEqual(response.data['summary']['rated'], 1)
+        self.assertEqual(response.data['summary']['by_status']['DONE'], 1)
+        self.assertEqual(response.data['summary']['done_duration_sec'], 300)
+
+    def test_today_query_count_is_fixed(self):
+        for count in (1, 10):
+            self._add_slots(count)
+            with self.assertNumQueries(2):
+                response = self.client.get(
+                    self.url, {'local_date': '2025-01-10', 'timezone': 'UTC'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_today_not_found(self):
+        response = self.client.get(
+            self.url, {'local_date': '2025-01-11', 'timezone': 'UTC'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_today_invalid_timezone(self):
+        response = self.client.get(self.url, {'timezone': 'Mars/Base'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+THROTTLE_TEST_SETTINGS = {
+    'DEFAULT_THROTTLE_RATES': {'login': '2/min', 'generate': '2/min', 'registration': '2/min'},
+}
+
+
+@override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, **THROTTLE_TEST_SETTINGS})
+class TestRateLimiting(APITestCase):
+    def setUp(self):
+        throttling.local_store.clear()
+        self.url = reverse('login-user')
+
+    def _exhaust_login(self):
+        data = {"username": "nobody", "password": "nopass"}
+        return [self.client.post(self.url, data, format="json") for _ in range(3)]
+
+    def test_login_is_limited_per_ip(self):
+        first, second, third = self._exhaust_login()
+        self.assertEqual(first.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(second.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(third.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(third['Retry-After'], '30')
+
+    def test_spoofed_forwarded_for_is_still_limited(self):
+        data = {"username": "nobody", "password": "nopass"}
+        responses = [
+            self.client.post(self.url, data, format="json", HTTP_X_FORWARDED_FOR=f'10.0.0.{i}')
+            for i in range(3)
+        ]
+        self.assertEqual(responses[-1].status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_only_the_proxy_added_address_counts(self):
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, **THROTTLE_TEST_SETTINGS,
+                                               'NUM_PROXIES': 1}):
+            data = {"username": "nobody", "password": "nopass"}
+            responses = [
+                self.client.post(self.url, data, format="json",
+                                 HTTP_X_FORWARDED_FOR=f'10.0.0.{i}, 203.0.113.7')
+                for i in range(3)
+            ]
+        self.assertEqual(responses[-1].status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(RATE_LIMIT_BACKEND='cache')
+    def test_cache_backend(self):
+        throttling.get_store().clear()
+        *_, third = self._exhaust_login()
+        self.assertEqual(third.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(len(throttling.local_store._buckets), 0)
+
+    @override_settings(RATE_LIMIT_BACKEND='cache')
+    def test_cache_backend_clear_keeps_other_keys(self):
+        cache = caches[settings.RATE_LIMIT_CACHE]
+        cache.set('unrelated', 'kept')
+        self._exhaust_login()
+        throttling.get_store().clear()
+        self.assertEqual(cache.get('unrelated'), 'kept')
+        first, *_ = self._exhaust_login()
+        self.assertEqual(first.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cache_lock_contention_uses_local_bucket(self):
+        fallback = throttling.LocalMemoryBucketStore()
+        store = throttling.CacheBucketStore(settings.RATE_LIMIT_CACHE, fallback=fallback)
+        store.lock_attempts = 1
+        store.clear()
+        with mock.patch.object(store.cache, 'add', return_value=False):
+            self.assertEqual(store.consume('k', 1, 1.0, now=100.0), 0)
+            self.assertAlmostEqual(store.consume('k', 1, 1.0, now=100.5), 0.5)
+        self.assertEqual(len(fallback._buckets), 1)
+
+    def test_bucket_refills(self):
+        store = throttling.LocalMemoryBucketStore()
+        self.assertEqual(store.consume('k', 1, 1.0, now=100.0), 0)
+        self.assertAlmostEqual(store.consume('k', 1, 1.0, now=100.5), 0.5)
+        self.assertEqual(store.consume('k', 1, 1.0, now=101.5), 0)
+
+    def test_overhead_is_sub_millisecond(self):
+        request = APIRequestFactory().post(self.url)
+        request.user = AnonymousUser()
+        throttle = throttling.GenerateRateThrottle()
+        throttle.rate = '1000000/s'
+        rounds = 2000
+        started = time.perf_counter()
+        for _ in range(rounds):
+            throttle.allow_request(request, None)
+        per_call = (time.perf_counter() - started) / rounds
+        self.assertLess(per_call, 0.001)
+
+
+class TestAvatarPipeline(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.media = override_settings(MEDIA_ROOT=self.media_root)
+        self.media.enable()
+        self.user = User.objects.create_user(username='avatar_user', password='userpass')
+
+    def tearDown(self):
+        self.media.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def _upload(self):
+        image = Image.new('RGB', (800, 600), 'red')
+        exif = Image.Exif()
+        exif[0x010F] = 'SecretCam'
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile('me.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_upload_schedules_processing(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.avatar = self._upload()
+            self.user.save()
+        self.assertEqual(len(callbacks), 1)
+
+    def test_process_avatar_builds_stripped_variants(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            self.user.avatar = self._upload()
+            self.user.save()
+        avatars.process_avatar(self.user.pk)
+        self.user.refresh_from_db()
+
+        variants = self.user.avatar_variants
+        self.assertEqual(variants['source'], self.user.avatar.name)
+        self.assertEqual(set(variants['webp']), {'64', '128', '256'})
+        with Image.open(f"{self.media_root}/{variants['jpeg']['128']}") as thumb:
+            self.assertEqual(thumb.size, (128, 128))
+            self.assertEqual(len(thumb.getexif()), 0)
+
+        data = UserSerializer(self.user).data
+        self.assertTrue(data['avatar_variants']['webp']['64'].endswith('-64.webp'))
+        self.assertNotIn('source', data['avatar_variants'])
+
+    def test_broken_upload_is_recorded_and_not_requeued(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            self.user.avatar = SimpleUploadedFile('me.jpg', b'not an image', content_type='image/jpeg')
+            self.user.save()
+        with self.assertLogs('api.avatars', 'ERROR'):
+            avatars.process_avatar(self.user.pk)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar_variants['source'], self.user.avatar.name)
+        self.assertIn('UnidentifiedImageError', self.user.avatar_variants['error'])
+        self.assertEqual(UserSerializer(self.user).data['avatar_variants'], {})
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.first_name = 'Renamed'
+            self.user.save()
+        self.assertEqual(callbacks, [])
+
+    def test_worker_logs_unexpected_errors(self):
+        with mock.patch('api.avatars.process_avatar', side_effect=RuntimeError('boom')), \
+                self.assertLogs('api.avatars', 'ERROR') as logs:
+            avatars._process_in_worker(self.user.pk)
+        self.assertIn('boom', logs.output[0])
+
+
+class TestSlotEvents(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='live_user', password='userpass')
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.day_plan = DayPlan.objects.create(user=self.user, local_date=date(2025, 1, 10))
+        self.slot = Slot.objects.create(
+            user=self.user, day_plan=self.day_plan, time_of_day='MORNING',
+            scheduled_at_utc=timezone.now() - timedelta(hours=3), duration_sec_snapshot=600)
+
+    def _parse(self, chunk):
+        event, data = chunk.decode().strip().split('\n')
+        return event[len('event: '):], json.loads(data[len('data: '):])
+
+    async def test_requires_token(self):
+        response = await self.async_client.get(reverse('slot-events'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refused_under_wsgi(self):
+        response = self.client.get(reverse('slot-events'), {'token': self.token})
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+    def _patch(self, url, data=None):
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.patch(url, data, format='json')
+
+    async def test_stream_pushes_status_changes_and_ticks(self):
+        response = await self.async_client.get(reverse('slot-events'), {'token': self.token})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+
+        event, data = self._parse(await anext(stream))
+        self.assertEqual((event, data), ('snapshot', {'active': []}))
+
+        response = await sync_to_async(self._patch)(reverse('slot-start', args=[self.slot.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        event, data = self._parse(await anext(stream))
+        self.assertEqual((event, data['type'], data['slot']['status']), ('slot', 'started', 'IN_PROGRESS'))
+
+        event, data = self._parse(await anext(stream))
+        self.assertEqual(event, 'tick')
+        self.assertEqual(data['timers'][0]['id'], str(self.slot.id))
+        self.assertLessEqual(data['timers'][0]['remaining_sec'], 600)
+
+        await sync_to_async(self._patch)(reverse('slot-finish', args=[self.slot.id]))
+        event, data = self._parse(await anext(stream))
+        self.assertEqual((event, data['type'], data['slot']['status']), ('slot', 'finished', 'DONE'))
+        await stream.aclose()
+
+    async def test_status_patch_without_start_time(self):
+        response = await self.async_client.get(reverse('slot-events'), {'token': self.token})
+        stream = response.streaming_content
+        await anext(stream)
+
+        response = await sync_to_async(self._patch)(
+            reverse('slot-detail', args=[self.slot.id]), {'status': 'IN_PROGRESS'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        event, data = self._parse(await anext(stream))
+        self.assertEqual((event, data['type'], data['slot']['started_at_utc']), ('slot', 'updated', None))
+
+        event, data = self._parse(await anext(stream))
+        self.assertEqual((event, data), ('tick', {'timers': []}))
+        await stream.aclose()
+
+    async def test_sweeper_marks_missed_and_publishes(self):
+        subscription = broker.subscribe(self.user.pk)
+        _, queue = subscription
+
+        def sweep():
+            with self.captureOnCommitCallbacks(execute=True):
+                return sweep_missed_slots()
+
+        swept = await sync_to_async(sweep)()
+        self.assertEqual(swept, 1)
+        event = await asyncio.wait_for(queue.get(), 1)
+        self.assertEqual(event['type'], 'missed')
+        self.assertEqual(event['slot']['status'], 'MISSED')
+        broker.unsubscribe(self.user.pk, subscription)
+        refreshed = await Slot.objects.aget(pk=self.slot.pk)
+        self.assertEqual(refreshed.status, Slot.Status.MISSED)
+
+
+class TestPracticeRecommender(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='bandit_user', password='userpass')
+        self.client.force_authenticate(self.user)
+        self.day_plan = DayPlan.objects.create(user=self.user, local_date=date(2025, 1, 10))
+        self.practices = [
+            PracticeTemplate.objects.create(user=self.user, title=f'P{i}', is_selected=True)
+            for i in range(8)
+        ]
+
+    def test_rating_updates_posterior(self):
+        practice = self.practices[0]
+        slot = Slot.objects.create(
+            user=self.user, day_plan=self.day_plan, user_practice=practice,
+            time_of_day='MORNING', scheduled_at_utc=timezone.now())
+        Rating.objects.create(slot=slot, mood=10, ease=10, satisfaction=10, nervousness=0)
+        practice.refresh_from_db()
+        self.assertEqual((practice.posterior_alpha, practice.posterior_beta), (2.0, 1.0))
+
+    def test_edited_and_deleted_ratings_correct_posterior(self):
+        practice = self.practices[0]
+        slot = Slot.objects.create(
+            user=self.user, day_plan=self.day_plan, user_practice=practice,
+            time_of_day='MORNING', scheduled_at_utc=timezone.now())
+        rating = Rating.objects.create(slot=slot, mood=10, ease=10, satisfaction=10, nervousness=0)
+        url = reverse('rating-detail', args=[rating.id])
+
+        response = self.client.patch(url, {'mood': 0, 'ease': 0, 'satisfaction': 0, 'nervousness': 10}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        practice.refresh_from_db()
+        self.assertAlmostEqual(practice.posterior_alpha, 1.0)
+        self.assertAlmostEqual(practice.posterior_beta, 2.0)
+
+        self.client.delete(url)
+        practice.refresh_from_db()
+        self.assertAlmostEqual(practice.posterior_alpha, 1.0)
+        self.assertAlmostEqual(practice.posterior_beta, 1.0)
+
+    def test_control_rating_is_ignored(self):
+        practice = self.practices[0]
+        slot = Slot.objects.create(
+            user=self.user, day_plan=self.day_plan, user_practice=practice, variant='CONTROL',
+            time_of_day='MORNING', scheduled_at_utc=timezone.now())
+        Rating.objects.create(slot=slot, mood=10)
+        practice.refresh_from_db()
+        self.assertEqual((practice.posterior_alpha, practice.posterior_beta), (1.0, 1.0))
+
+    def test_choose_prefers_strong_posteriors(self):
+        PracticeTemplate.objects.filter(pk=self.practices[3].pk).update(
+            posterior_alpha=500, posterior_beta=1)
+        PracticeTemplate.objects.filter(user=self.user).exclude(pk=self.practices[3].pk).update(
+            posterior_alpha=1, posterior_beta=500)
+        practices = list(PracticeTemplate.objects.filter(user=self.user))
+        self.assertEqual(recommender.choose_practices(practices, 1)[0].pk, self.practices[3].pk)
+
+    def test_create_slots_returns_new_plan(self):
+        response = self.client.post(reverse('slot-list'), {'day_plan': str(self.day_plan.id)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 6)
+        self.assertEqual(Slot.objects.filter(day_plan=self.day_plan).count(), 6)
+        self.assertEqual(len({slot['user_practice'] for slot in response.data}), 6)
+
+    def test_simulation_beats_random(self):
+        result = recommender.simulate(n_practices=20, rounds=300, k=3)
+        self.assertLess(result['regret']['thompson'], result['regret']['random'])
+
+
+class TestNearDuplicatePractices(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='dup_user', password='userpass')
+        self.other = User.objects.create_user(username='dup_other', password='userpass')
+        self.original = PracticeTemplate.objects.create(
+            user=self.user, title='Morning walk', description='Walk outside for ten minutes after waking up')
+
+    def test_near_duplicate_is_flagged_on_insert(self):
+        copy = PracticeTemplate.objects.create(
+            user=self.user, title='Morning walks', description='Walk outside for ten minutes, after waking up.')
+        self.assertEqual(copy.duplicate_of, self.original)
+
+    def test_distinct_or_foreign_practice_is_not_flagged(self):
+        other_text = PracticeTemplate.objects.create(
+            user=self.user, title='Evening reading', description='Read a paper book before bed')
+        other_user = PracticeTemplate.objects.create(
+            user=self.other, title='Morning walk', description='Walk outside for ten minutes after waking up')
+        self.assertIsNone(other_text.duplicate_of)
+        self.assertIsNone(other_user.duplicate_of)
+
+    def test_model_index_loads_outside_the_request(self):
+        index = ModelIndex(PracticeTemplate.objects.all, text_of=lambda practice: practice.title)
+        with mock.patch('api.similarity.threading.Thread') as thread:
+            index.sync()
+        thread.return_value.start.assert_called_once()
+        self.assertEqual(len(index), 0)
+
+        index.load()
+        self.assertIn(self.original.pk, index)
+
+    def test_lookup_is_sub_millisecond(self):
+        index = SimilarityIndex()
+        words = 'morning evening walk read sleep water yoga plank tea journal music code'.split()
+        for key in range(5000):
+            index.add(key, ' '.join(words[(key + i) % len(words)] for i in range(8)) + f' n{key}')
+        started = time.perf_counter()
+        for key in range(500):
+            self.assertEqual(index.best(f'{words[key % len(words)]} n{key}', 0.9), None)
+            index.query('morning walk read sleep water yoga plank tea n1', 0.8)
+        self.assertLess((time.perf_counter() - started) / 1000, 0.001)
+
+
+@override_settings(COHORT_REFRESH_LAG=0)
+class TestCohortAnalytics(APITestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='staff', password='userpass', is_staff=True)
+        self.users = [User.objects.create_user(username=f'cohort{i}', password='userpass') for i in range(2)]
+        for user in self.users:
+            self._rate(user, 'Morning Walk', 'DO', 'MORNING', mood=8)
+            self._rate(user, 'morning walk ', 'CONTROL', 'EVENING', mood=4)
+
+    def _rate(self, user, title, variant, time_of_day, mood):
+        day_plan, _ = DayPlan.objects.get_or_create(user=user, local_date=date(2025, 1, 10))
+        practice = PracticeTemplate.objects.create(user=user, title=title)
+        slot = Slot.objects.create(
+            user=user, day_plan=day_plan, user_practice=practice, variant=variant,
+            time_of_day=time_of_day, scheduled_at_utc=timezone.now())
+        Rating.objects.create(slot=slot, mood=mood)
+
+    def test_refresh_is_incremental(self):
+        self.assertEqual(cohorts.refresh(), 4)
+        self.assertEqual(cohorts.refresh(), 0)
+        self._rate(self.users[0], 'Morning walk', 'DO', 'MORNING', mood=2)
+        self.assertEqual(cohorts.refresh(), 1)
+        summary = CohortSummary.objects.get(dimension='TITLE', key='morning walk', variant='DO')
+        self.assertEqual((summary.count, summary.mood_sum), (3, 18))
+
+        self.assertEqual(cohorts.refresh(full=True), 5)
+        summary = CohortSummary.objects.get(dimension='TITLE', key='morning walk', variant='DO')
+        self.assertEqual((summary.count, summary.mood_sum), (3, 18))
+
+    def _summaries(self):
+        return {
+            (row.dimension, row.key, row.variant): (row.count, row.mood_sum)
+            for row in CohortSummary.objects.all() if row.count
+        }
+
+    def test_edits_and_deletes_reach_summaries(self):
+        cohorts.refresh()
+        user = self.users[0]
+        rating = Rating.objects.filter(user=user, slot__variant='DO').get()
+        self.client.force_authenticate(user)
+        self.client.patch(reverse('rating-detail', args=[rating.id]), {'mood': 1}, format='json')
+
+        slot = Slot.objects.get(user=user, variant='CONTROL')
+        slot.variant = 'DO'
+        slot.time_of_day = 'MORNING'
+        slot.save()
+        practice = slot.user_practice
+        practice.title = 'Evening stretch'
+        practice.save()
+
+        self.client.force_authenticate(self.users[1])
+        deleted = Rating.objects.get(user=self.users[1], slot__variant='CONTROL')
+        self.client.delete(reverse('rating-detail', args=[deleted.id]))
+
+        incremental = self._summaries()
+        self.assertEqual(incremental[('TITLE', 'morning walk', 'DO')], (2, 9))
+        self.assertEqual(incremental[('TITLE', 'evening stretch', 'DO')], (1, 4))
+        self.assertNotIn(('TITLE', 'morning walk', 'CONTROL'), incremental)
+        cohorts.refresh(full=True)
+        self.assertEqual(incremental, self._summaries())
+
+    def test_endpoint_reports_deltas_for_staff(self):
+        cohorts.refresh()
+        url = reverse('cohort-analytics')
+        self.client.force_authenticate(self.users[0])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(self.staff)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        row, = response.data['results']
+        self.assertEqual(row['key'], 'morning walk')
+        self.assertEqual(row['delta']['mood'], 4)
+
+        response = self.client.get(url, {'dimension': 'time_of_day'})
+        self.assertEqual({row['key'] for row in response.data['results']}, {'MORNING'})
+        self.assertIsNone(response.data['results'][0]['delta'])
+
+
+class TestIdempotencyKeys(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='retry_user', password='userpass')
+        self.client.force_authenticate(self.user)
+        self.day_plan = DayPlan.objects.create(user=self.user, local_date=date(2025, 1, 10))
+        for i in range(3):
+            PracticeTemplate.objects.create(user=self.user, title=f'Retry {i}', is_selected=True)
+        self.url = reverse('slot-list')
+        self.data = {'day_plan': str(self.day_plan.id)}
+
+    def _post(self, data=None, key='key-1'):
+        return self.client.post(self.url, data or self.data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_first_response(self):
+        first = self._post()
+        second = self._post()
+        self.assertEqual(second.status_code, first.status_code)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Slot.objects.filter(day_plan=self.day_plan).count(), 3)
+
+    def test_without_key_request_is_repeated(self):
+        self.client.post(self.url, self.data, format='json')
+        response = self.client.post(self.url, self.data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_key_reused_for_other_request(self):
+        self._post()
+        other_plan = DayPlan.objects.create(user=self.user, local_date=date(2025, 1, 11))
+        response = self._post({'day_plan': str(other_plan.id)})
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_expired_key_runs_again(self):
+        self._post()
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        response = self._post()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+    def test_duplicate_waits_for_in_flight_request(self):
+        first = self._post()
+        IdempotencyKey.objects.update(state=IdempotencyKey.State.IN_FLIGHT)
+
+        def finish_original(_):
+            IdempotencyKey.objects.update(state=IdempotencyKey.State.DONE)
+
+        with mock.patch('api.idempotency.time.sleep', side_effect=finish_original) as sleep:
+            second = self._post()
+        self.assertEqual(sleep.call_count, 1)
+        self.assertEqual(second.json(), first.json())
+
+    @override_settings(IDEMPOTENCY_WAIT_SEC=0)
+    def test_duplicate_gives_up_on_stuck_request(self):
+        self._post()
+        IdempotencyKey.objects.update(state=IdempotencyKey.State.IN_FLIGHT)
+        self.assertEqual(self._post().status_code, status.HTTP_409_CONFLICT)
+
+    def test_abandoned_in_flight_key_is_taken_over(self):
+        self._post()
+        IdempotencyKey.objects.update(
+            state=IdempotencyKey.State.IN_FLIGHT,
+            created_at=timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_IN_FLIGHT_TIMEOUT + 1))
+
+        with mock.patch('api.idempotency.time.sleep') as sleep:
+            response = self._post()
+        sleep.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('Idempotent-Replayed', response)
+        record = IdempotencyKey.objects.get()
+        self.assertEqual((record.state, record.response_status), (IdempotencyKey.State.DONE, 400))
+
+
+def seed_history(user, practice, count, offset=0):
+    """``count`` past days for ``user``, each with one rated slot, via bulk inserts."""
+    now = timezone.now()
+    plans = DayPlan.objects.bulk_create([
+        DayPlan(user=user, local_date=date(1990, 1, 1) + timedelta(days=offset + i))
+        for i in range(count)
+    ])
+    slots = Slot.objects.bulk_create([
+        Slot(user=user, day_plan=plan, user_practice=practice, time_of_day='MORNING',
+             status='DONE', scheduled_at_utc=now - timedelta(days=offset + i), duration_sec_snapshot=300)
+        for i, plan in enumerate(plans)
+    ])
+    Rating.objects.bulk_create([Rating(slot=slot, user=user, mood=i % 11) for i, slot in enumerate(slots)])
+
+
+def assert_index_used(test, queryset, table):
+    """Fail if the plan reads ``table`` with a full scan instead of an index."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    plan = queryset.explain()
+    if connection.vendor == 'postgresql':
+        test.assertNotIn(f'Seq Scan on {table}', plan, plan)
+    elif connection.vendor == 'sqlite':
+        scans = [line for line in plan.splitlines() if f'SCAN {table}' in line and 'INDEX' not in line]
+        test.assertEqual(scans, [], plan)
+
+
+class TestQueryScaling(APITestCase):
+    """Endpoints must not grow in query count with history size, and bounded
+    endpoints must not grow (much) in time either."""
+    sizes = (1, 100, 10000)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='scale_user', password='userpass')
+        self.client.force_authenticate(self.user)
+        self.practice = PracticeTemplate.objects.create(
+            user=self.user, title='Scaled practice', is_selected=True)
+        self.today = DayPlan.objects.create(user=self.user, local_date=date(2025, 1, 10))
+        for i in range(3):
+            Slot.objects.create(
+                user=self.user, day_plan=self.today, user_practice=self.practice,
+                time_of_day='MORNING', scheduled_at_utc=timezone.now() + timedelta(hours=i))
+
+    def _measure(self, url, params=None, rounds=3):
+        best = None
+        for _ in range(rounds):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = self.client.get(url, params)
+                elapsed = time.perf_counter() - started
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            best = elapsed if best is None else min(best, elapsed)
+        return len(queries), best
+
+    def test_query_count_and_time_by_history_size(self):
+        bounded = {
+            'today': (reverse('day_plan-today'), {'local_date': '2025-01-10'}),
+            'day_plan': (reverse('day_plan-list'), {'local_date': '2025-01-10'}),
+            'slots_for_day': (reverse('slot-list'), {'day_plan': str(self.today.id)}),
+            'selected_practices': (reverse('practice-list'), {'selected_only': 'true'}),
+        }
+        unbounded = {
+            'slots': (reverse('slot-list'), None),
+            'ratings': (reverse('rating-list'), None),
+        }
+        results = {name: [] for name in (*bounded, *unbounded)}
+
+        seeded = 0
+        for size in self.sizes:
+            seed_history(self.user, self.practice, size - seeded, offset=seeded)
+            seeded = size
+            for name, (url, params) in bounded.items():
+                results[name].append(self._measure(url, params))
+            for name, (url, params) in unbounded.items():
+                results[name].append(self._measure(url, params, rounds=1))
+
+        for name, measured in results.items():
+            with self.subTest(endpoint=name):
+                counts = [count for count, _ in measured]
+                self.assertEqual(len(set(counts)), 1, f'{name} query counts by size: {counts}')
+                if name in bounded:
+                    small, large = measured[0][1], measured[-1][1]
+                    # 10000x more history; linear growth would be ~10000x slower.
+                    self.assertLess(large, small * 10 + 0.05, f'{name}: {small:.4f}s -> {large:.4f}s')
+
+    def test_key_queries_use_indexes(self):
+        others = [User.objects.create_user(username=f'noise{i}', password='x') for i in range(20)]
+        for other in others:
+            practice = PracticeTemplate.objects.create(user=other, title='Noise', is_selected=True)
+            seed_history(other, practice, 100)
+        seed_history(self.user, self.practice, 100)
+
+        checks = [
+            ('api_dayplan', DayPlan.objects.filter(user=self.user, local_date=date(2025, 1, 10))),
+            ('api_slot', Slot.objects.filter(user=self.user, day_plan=self.today)),
+            ('api_slot', Slot.objects.filter(user=self.user).order_by('scheduled_at_utc')),
+            ('api_practicetemplate', PracticeTemplate.objects.filter(
+                user=self.user, is_selected=True).order_by('-created_at')),
+            ('api_rating', Rating.objects.filter(slot__user=self.user)),
+            ('api_rating', Rating.objects.filter(user=self.user).order_by('rated_at_utc')),
+            ('api_slot', Slot.objects.filter(status='PLANNED', scheduled_at_utc__lt=timezone.now())),
+        ]
+        for table, queryset in checks:
+            with self.subTest(table=table):
+                assert_index_used(self, queryset, table)
+
+    def test_bench_refuses_dropping_indexes_outside_test_database(self):
+        with mock.patch('api.management.commands.bench_queries._is_test_database', return_value=False):
+            with self.assertRaises(CommandError):
+                call_command('bench_queries', '--without-indexes', stdout=StringIO())
+        self.assertEqual(User.objects.filter(username__startswith='bench-').count(), 0)
+
+    def test_rating_user_follows_slot(self):
+        slot = Slot.objects.create(
+            user=self.user, day_plan=self.today, user_practice=self.practice, time_of_day='MORNING',
+            status='DONE', scheduled_at_utc=timezone.now(), duration_sec_snapshot=300)
+        rating = Rating.objects.create(slot_id=slot.id, mood=5)
+        self.assertEqual(rating.user, self.user)
+
+        response = self.client.get(reverse('rating-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(str(rating.id), [row['id'] for row in response.data])
+
+    def test_rating_reads_do_not_join_slots(self):
+        seed_history(self.user, self.practice, 3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('rating-list'))
+        self.assertEqual(len(response.data), 3)
+        self.assertNotIn('JOIN "api_slot"', queries[-1]['sql'])
+
+
+class TestRatingTrend(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='trend_user', password='userpass')
+        self.client.force_authenticate(self.user)
+        DayPlan.objects.create(user=self.user, local_date=date(2025, 1, 1), timezone='Europe/Warsaw')
+        self.url = reverse('rating-trend')
+
+    def _rate(self, rated_at, variant='DO', mood=5):
+        day_plan, _ = DayPlan.objects.get_or_create(
+            user=self.user, local_date=rated_at.date(), defaults={'timezone': 'Europe/Warsaw'})
+        slot = Slot.objects.create(
+            user=self.user, day_plan=day_plan, variant=variant, time_of_day='EVENING',
+            scheduled_at_utc=rated_at)
+        rating = Rating.objects.create(slot=slot, mood=mood)
+        Rating.objects.filter(pk=rating.pk).update(rated_at_utc=rated_at)
+
+    def test_buckets_in_plan_timezone_and_split_by_variant(self):
+        utc = ZoneInfo('UTC')
+        self._rate(datetime(2025, 1, 10, 23, 30, tzinfo=utc), mood=8)
+        self._rate(datetime(2025, 1, 11, 8, 0, tzinfo=utc), mood=4)
+        self._rate(datetime(2025, 1, 11, 9, 0, tzinfo=utc), variant='CONTROL', mood=2)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['timezone'], 'Europe/Warsaw')
+        do, = response.data['series']['DO']
+        self.assertEqual((do['bucket'], do['count'], do['mood']), ('2025-01-11', 2, 6))
+        control, = response.data['series']['CONTROL']
+        self.assertEqual(control['mood'], 2)
+
+        response = self.client.get(self.url, {'timezone': 'UTC', 'bucket': 'month'})
+        self.assertEqual(response.data['series']['DO'][0]['bucket'], '2025-01-01')
+
+    def test_downsamples_to_point_budget(self):
+        start = datetime(2024, 1, 1, 12, tzinfo=ZoneInfo('UTC'))
+        for day in range(40):
+            self._rate(start + timedelta(days=day), mood=day % 10)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'points': 10})
+        series = response.data['series']['DO']
+        self.assertEqual(len(series), 10)
+        self.assertEqual(series[0]['bucket'], '2024-01-01')
+        self.assertEqual(series[-1]['bucket'], '2024-02-09')
+
+    def test_date_range_is_inclusive(self):
+        utc = ZoneInfo('UTC')
+        for day in (30, 31):
+            self._rate(datetime(2025, 1, day, 20, 0, tzinfo=utc))
+        self._rate(datetime(2025, 2, 1, 0, 30, tzinfo=utc))  # Feb 1, 01:30 in Warsaw
+
+        response = self.client.get(self.url, {'from': '2025-01-31', 'to': '2025-01-31'})
+        self.assertEqual([row['bucket'] for row in response.data['series']['DO']], ['2025-01-31'])
+
+    def test_invalid_params(self):
+        for params in ({'bucket': 'hour'}, {'points': 2}, {'timezone': 'Nowhere/City'}, {'from': '2025-13-01'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_lttb_keeps_extremes(self):
+        xs = list(range(100))
+        ys = [0] * 100
+        ys[37] = 50
+        picked = lttb(xs, ys, 5)
+        self.assertEqual(len(picked), 5)
+        self.assertIn(37, picked)
+        self.assertEqual((picked[0], picked[-1]), (0, 99))
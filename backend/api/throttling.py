@@ -0,0 +1,153 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'5/min' -> (capacity 5, refill 5 tokens per 60 seconds)."""
+    num, period = rate.split('/')
+    capacity = int(num)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+class LocalMemoryBucketStore:
+    """Token buckets held in this process. Correct for a single worker and tests."""
+    max_keys = 10000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate, now):
+        """Take one token; return 0 if allowed, otherwise seconds until one is available."""
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / refill_rate
+            if len(self._buckets) > self.max_keys:
+                self._prune(capacity, refill_rate, now)
+            return wait
+
+    def _prune(self, capacity, refill_rate, now):
+        # Buckets that have refilled completely carry no state worth keeping.
+        full_after = capacity / refill_rate
+        self._buckets = {
+            key: value for key, value in self._buckets.items()
+            if now - value[1] < full_after
+        }
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """Token buckets in a Django cache shared by all gunicorn workers.
+
+    Read-modify-write is serialised with a short lock taken through the atomic
+    ``cache.add``. If the lock can't be taken quickly (one client hammering the
+    same bucket) the request is charged to this worker's local bucket instead,
+    so contention never lets traffic through unmetered.
+
+    Keys carry a generation number so ``clear`` can drop every bucket without
+    touching the rest of the cache.
+    """
+    lock_timeout = 1
+    lock_attempts = 20
+    generation_key = 'throttle:generation'
+
+    def __init__(self, alias, fallback=None):
+        self.cache = caches[alias]
+        self.fallback = fallback
+
+    def consume(self, key, capacity, refill_rate, now):
+        key = f'{key}:g{self.cache.get(self.generation_key, 0)}'
+        lock_key = f'{key}:lock'
+        for _ in range(self.lock_attempts):
+            if self.cache.add(lock_key, 1, self.lock_timeout):
+                break
+            time.sleep(0.001)
+        else:
+            return self.fallback.consume(key, capacity, refill_rate, now)
+        try:
+            tokens, updated = self.cache.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / refill_rate
+            self.cache.set(key, (tokens, now), int(capacity / refill_rate) + 1)
+            return wait
+        finally:
+            self.cache.delete(lock_key)
+
+    def clear(self):
+        if not self.cache.add(self.generation_key, 1, None):
+            self.cache.incr(self.generation_key)
+
+
+local_store = LocalMemoryBucketStore()
+
+
+def get_store():
+    if settings.RATE_LIMIT_BACKEND == 'cache':
+        return CacheBucketStore(settings.RATE_LIMIT_CACHE, fallback=local_store)
+    return local_store
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Token bucket per ``scope``; the rate comes from DEFAULT_THROTTLE_RATES.
+
+    A rate of '5/min' allows bursts of 5 requests and refills 5 tokens a minute.
+    """
+    scope = None
+    per_user = True
+
+    def __init__(self):
+        self.rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        self.retry_after = None
+
+    def get_cache_key(self, request):
+        if self.per_user and request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return f'throttle:{self.scope}:{ident}'
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        capacity, refill_rate = parse_rate(self.rate)
+        self.retry_after = get_store().consume(
+            self.get_cache_key(request), capacity, refill_rate, time.time())
+        return self.retry_after == 0
+
+    def wait(self):
+        return self.retry_after
+
+
+class GenerateRateThrottle(TokenBucketThrottle):
+    scope = 'generate'
+
+
+class LoginRateThrottle(TokenBucketThrottle):
+    scope = 'login'
+    per_user = False
+
+
+class RegistrationRateThrottle(TokenBucketThrottle):
+    scope = 'registration'
+    per_user = False
@@ -0,0 +1,74 @@
+from django.db.models import Avg, Count, F
+from django.db.models.functions import Trunc
+
+from api.models import Rating, Slot, rating_score
+
+
+BUCKETS = ('day', 'week', 'month')
+METRICS = ('mood', 'ease', 'satisfaction', 'nervousness')
+
+
+def lttb(xs, ys, threshold):
+    """Largest-Triangle-Three-Buckets: indices of ``threshold`` points that keep the series' shape."""
+    n = len(xs)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 3:
+        return [0, n - 1][:threshold]
+
+    selected = [0]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex.
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+def rating_trend(user, bucket, tz, points, metric='score', start=None, end=None):
+    """Per-bucket rating stats split by variant, aggregated in SQL and LTTB-downsampled to ``points``.
+
+    ``start`` is inclusive and ``end`` exclusive.
+    """
+    ratings = Rating.objects.filter(user=user)
+    if start:
+        ratings = ratings.filter(rated_at_utc__gte=start)
+    if end:
+        ratings = ratings.filter(rated_at_utc__lt=end)
+
+    rows = (
+        ratings
+        .annotate(bucket=Trunc('rated_at_utc', bucket, tzinfo=tz))
+        .values('bucket', variant=F('slot__variant'))
+        .annotate(count=Count('id'), **{m: Avg(m) for m in METRICS})
+        .order_by('variant', 'bucket')
+    )
+
+    series = {variant: [] for variant in Slot.Variant.values}
+    for row in rows:
+        row['score'] = rating_score(*(row[m] for m in METRICS))
+        series[row.pop('variant')].append(row)
+
+    for variant, values in series.items():
+        if len(values) > points:
+            xs = [row['bucket'].timestamp() for row in values]
+            ys = [row[metric] for row in values]
+            values = [values[i] for i in lttb(xs, ys, points)]
+        series[variant] = [
+            {**row, 'bucket': row['bucket'].date().isoformat()} for row in values
+        ]
+    return series
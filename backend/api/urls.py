@@ -2,11 +2,13 @@ from django.urls import path
 from rest_framework.routers import DefaultRouter
 from .views import PracticeTemplateViewSet, DayPlanViewSet, SlotViewSet, RatingViewSet
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from .views import get_users, get_user, register_user, login_user, logout_user
+from .views import get_users, get_user, register_user, login_user, logout_user, cohort_analytics
 from drf_yasg import openapi
 from drf_yasg.views import get_schema_view as swagger_get_schema_view
 from rest_framework.permissions import AllowAny
 from ai_agent.views import generate_practices_view
+from jobs.views import JobViewSet
+from .events import slot_events_view
 
 schema_view = swagger_get_schema_view(
     openapi.Info(
@@ -23,6 +25,7 @@ router.register(r'practices', PracticeTemplateViewSet, basename='practice')
 router.register(r'day_plan', DayPlanViewSet, basename='day_plan')
 router.register(r'slots', SlotViewSet, basename='slot')
 router.register(r'ratings', RatingViewSet, basename='rating')
+router.register(r'jobs', JobViewSet, basename='job')
 
 urlpatterns = [
     path('swagger/schema/',
@@ -35,4 +38,6 @@ urlpatterns = [
     path('users/login/', login_user, name='login-user'),
     path('users/logout/', logout_user, name='logout-user'),
     path('practices/generate/', generate_practices_view, name='generate-practices'),
+    path('slots/events/', slot_events_view, name='slot-events'),
+    path('analytics/cohorts/', cohort_analytics, name='cohort-analytics'),
 ] + router.urls
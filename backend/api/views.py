@@ -1,22 +1,32 @@
 from django.contrib.auth import authenticate, login, logout, get_user_model
-from rest_framework.decorators import api_view, permission_classes, authentication_classes
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, throttle_classes
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
+from django.conf import settings
 from django.utils import timezone
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 from api.models import User, PracticeTemplate,  DayPlan, Slot, Rating
 from api.serializers import (UserSerializer, PracticeTemplateSerializer,
-                             DayPlanSerializer, SlotSerializer, RatingSerializer)
+                             DayPlanSerializer, SlotSerializer, RatingSerializer,
+                             DayPlanDashboardSerializer)
 from rest_framework.permissions import AllowAny
+from api.throttling import LoginRateThrottle, RegistrationRateThrottle
+from api.realtime import publish_slot
+from api.recommender import choose_practices
+from api import cohorts
+from api.models import CohortSummary, SummaryWatermark
+from api.idempotency import idempotent
+from api import trends
 from rest_framework import viewsets, permissions
 import random
-from datetime import timedelta
-from django.db.models import Avg, Q
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.db.models import Prefetch
 
 # Create your views here.
 
@@ -44,6 +54,7 @@ def get_user(request, pk):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([RegistrationRateThrottle])
 def register_user(request):
     username = request.data.get('username')
     password = request.data.get('password')
@@ -72,6 +83,7 @@ def register_user(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginRateThrottle])
 def login_user(request):
     username = request.data.get('username')
     password = request.data.get('password')
@@ -98,6 +110,26 @@ def logout_user(request):
         return Response({'error': 'Invalid refresh token'}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def cohort_analytics(request):
+    """Staff-only DO vs CONTROL deltas across all users, read from the summary tables"""
+    dimension = request.query_params.get('dimension', CohortSummary.Dimension.TITLE).upper()
+    if dimension not in CohortSummary.Dimension.values:
+        return Response({'detail': 'dimension must be TITLE or TIME_OF_DAY'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        min_count = int(request.query_params.get('min_count', 1))
+    except ValueError:
+        return Response({'detail': 'min_count must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    watermark = SummaryWatermark.objects.filter(name=cohorts.WATERMARK).first()
+    return Response({
+        'dimension': dimension,
+        'rated_until': watermark.rated_until if watermark else None,
+        'results': cohorts.report(dimension, min_count),
+    })
+
+
 class PracticeTemplateViewSet(viewsets.ModelViewSet):
     serializer_class = PracticeTemplateSerializer
 
@@ -142,6 +174,7 @@ class DayPlanViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         local_date = request.data.get('local_date')
         timezone = request.data.get('timezone')
@@ -160,6 +193,36 @@ class DayPlanViewSet(viewsets.ModelViewSet):
         ser = self.get_serializer(obj)
         return Response(ser.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
+    @action(detail=False, methods=['get'])
+    def today(self, request):
+        """Day plan with slots, practices, ratings and summary in two queries."""
+        tz_name = request.query_params.get('timezone', 'UTC')
+        try:
+            tz = ZoneInfo(tz_name)
+        except (ZoneInfoNotFoundError, ValueError):
+            return Response({'detail': 'Unknown timezone'}, status=status.HTTP_400_BAD_REQUEST)
+
+        local_date = request.query_params.get('local_date')
+        if local_date:
+            try:
+                local_date = date.fromisoformat(local_date)
+            except ValueError:
+                return Response({'detail': 'local_date must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            local_date = timezone.now().astimezone(tz).date()
+
+        slots = Slot.objects.select_related('user_practice', 'rating').order_by('scheduled_at_utc')
+        day_plan = (
+            DayPlan.objects
+            .filter(user=request.user, local_date=local_date)
+            .prefetch_related(Prefetch('slots', queryset=slots))
+            .first()
+        )
+        if day_plan is None:
+            return Response({'detail': 'Day plan not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(DayPlanDashboardSerializer(day_plan).data, status=status.HTTP_200_OK)
+
     def get_queryset(self):
         qs = DayPlan.objects.filter(user=self.request.user)
         ld = self.request.query_params.get('local_date')
@@ -178,6 +241,13 @@ class SlotViewSet(viewsets.ModelViewSet):
         day_plan_id = self.request.query_params.get('day_plan')
         return qs.filter(day_plan_id=day_plan_id) if day_plan_id else qs
 
+    def perform_update(self, serializer):
+        previous_status = serializer.instance.status
+        slot = serializer.save()
+        if slot.status != previous_status:
+            publish_slot(slot, 'updated')
+
+    @idempotent
     def create(self, request, *args, **kwargs):
         day_plan_id = request.data.get('day_plan')
         if not day_plan_id:
@@ -209,8 +279,7 @@ class SlotViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        random.shuffle(available_practices)
-        selected_practices = available_practices[:6]
+        selected_practices = choose_practices(available_practices, 6)
 
         created_slots = []
         for i, practice in enumerate(selected_practices):
@@ -224,30 +293,7 @@ class SlotViewSet(viewsets.ModelViewSet):
             )
             created_slots.append(slot)
 
-        avg_rating = Rating.objects.filter(slot__user=request.user).aggregate(
-            avg_mood=Avg('mood'),
-            avg_ease=Avg('ease'),
-            avg_satisfaction=Avg('satisfaction'),
-            avg_nervousness=Avg('nervousness'),
-        )
-
-        overall_avg = sum([
-            avg_rating['avg_mood'] or 0,
-            avg_rating['avg_ease'] or 0,
-            avg_rating['avg_satisfaction'] or 0,
-            avg_rating['avg_nervousness'] or 0
-        ]) / 4
-
-        candidate_slots = Slot.objects.filter(user=request.user).filter(
-            Q(rating__isnull=True) |
-            Q(rating__mood__gte=overall_avg) |
-            Q(rating__satisfaction__gte=overall_avg)
-        ).distinct()
-        candidate_slots = list(candidate_slots)
-        random.shuffle(candidate_slots)
-        selected_slots = candidate_slots[:6]
-
-        serializer = self.get_serializer(selected_slots, many=True)
+        serializer = self.get_serializer(created_slots, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['patch'])
@@ -256,6 +302,7 @@ class SlotViewSet(viewsets.ModelViewSet):
         slot.status = 'IN_PROGRESS'
         slot.started_at_utc = timezone.now()
         slot.save()
+        publish_slot(slot, 'started')
         return Response(SlotSerializer(slot).data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['patch'])
@@ -264,6 +311,7 @@ class SlotViewSet(viewsets.ModelViewSet):
         slot.status = 'DONE'
         slot.ended_at_utc = timezone.now()
         slot.save()
+        publish_slot(slot, 'finished')
         return Response(SlotSerializer(slot).data, status=status.HTTP_200_OK)
 
 
@@ -273,7 +321,49 @@ class RatingViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Rating.objects.filter(slot__user=self.request.user)
+        return Rating.objects.filter(user=self.request.user)
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'])
+    def trend(self, request):
+        """Rating stats per day/week/month and variant, downsampled to at most `points` per series.
+
+        Optional `from`/`to` are inclusive local dates in `timezone`.
+        """
+        params = request.query_params
+        bucket = params.get('bucket', 'day')
+        if bucket not in trends.BUCKETS:
+            return Response({'detail': 'bucket must be day, week or month'}, status=status.HTTP_400_BAD_REQUEST)
+        metric = params.get('metric', 'score')
+        if metric not in (*trends.METRICS, 'score'):
+            return Response({'detail': 'Unknown metric'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            points = min(int(params.get('points', settings.TREND_MAX_POINTS)), settings.TREND_MAX_POINTS)
+        except ValueError:
+            points = 0
+        if points < 3:
+            return Response({'detail': 'points must be an integer >= 3'}, status=status.HTTP_400_BAD_REQUEST)
+
+        tz_name = params.get('timezone')
+        if not tz_name:
+            latest_plan = DayPlan.objects.filter(user=request.user).order_by('-local_date').first()
+            tz_name = latest_plan.timezone if latest_plan else 'UTC'
+        try:
+            tz = ZoneInfo(tz_name)
+            # `from` and `to` are local dates, both inclusive: `to` runs until the next midnight.
+            start, end = (
+                datetime.combine(date.fromisoformat(params[name]) + timedelta(days=extra), time.min, tzinfo=tz)
+                if params.get(name) else None
+                for name, extra in (('from', 0), ('to', 1))
+            )
+        except (ZoneInfoNotFoundError, ValueError):
+            return Response({'detail': 'Invalid timezone or date'}, status=status.HTTP_400_BAD_REQUEST)
+
+        series = trends.rating_trend(request.user, bucket, tz, points, metric, start, end)
+        return Response({'bucket': bucket, 'timezone': tz_name, 'metric': metric, 'series': series})
 
     def perform_create(self, serializer):
         serializer.save(rated_at_utc=timezone.now())
@@ -0,0 +1,65 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs import queue
+from jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs on a thread or process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.JOB_WORKER_CONCURRENCY)
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Seconds to sleep when the queue is empty")
+        parser.add_argument('--burst', action='store_true',
+                            help="Exit once the queue is drained instead of polling forever")
+
+    def handle(self, *args, concurrency, mode, poll_interval, burst, **options):
+        requeued = queue.requeue_stale(settings.JOB_TIMEOUT)
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s)")
+
+        if mode == 'process':
+            # Workers fork lazily, after claim() has reopened the parent's
+            # connection, so each child drops its inherited copy on start.
+            executor = ProcessPoolExecutor(
+                max_workers=concurrency, mp_context=multiprocessing.get_context('fork'),
+                initializer=queue.forget_inherited_connections)
+        else:
+            executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job')
+
+        counts = {status: 0 for status in Job.Status.values}
+        in_flight = set()
+        started = time.monotonic()
+        try:
+            while True:
+                free = concurrency - len(in_flight)
+                ids = queue.claim(free) if free else []
+                in_flight.update(executor.submit(queue.run_in_worker, job_id) for job_id in ids)
+
+                if not in_flight:
+                    if burst:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                finished, in_flight = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    counts[future.result()] += 1
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping, waiting for running jobs...")
+        finally:
+            executor.shutdown(wait=True)
+
+        elapsed = time.monotonic() - started
+        total = sum(counts.values())
+        self.stdout.write(
+            f"Processed {total} job(s) in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.1f}/s): "
+            + ", ".join(f"{status.lower()}={count}" for status, count in counts.items() if count)
+        )
@@ -0,0 +1,148 @@
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from jobs.models import Job
+
+
+registry = {}
+
+
+def job(name):
+    """Register ``func(job)`` as the handler for jobs called ``name``.
+
+    The handler's return value must be JSON-serialisable and is stored on the job.
+    """
+    def decorator(func):
+        registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, user=None, max_attempts=None):
+    if name not in registry:
+        raise KeyError(f"Unknown job '{name}'")
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        user=user,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2*base, 4*base ... capped at JOB_RETRY_MAX_DELAY."""
+    delay = settings.JOB_RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(delay, settings.JOB_RETRY_MAX_DELAY))
+
+
+LOCK_RETRIES = 5
+
+
+def _retry_on_lock(func):
+    """Call ``func()``, retrying briefly on SQLite's "database table is locked".
+
+    SQLite has no row locks; with several worker threads on a shared-cache
+    database (the local/test setup) a writer can find the table locked by
+    another instead of waiting for it. Other backends never raise this.
+    """
+    for attempt in range(LOCK_RETRIES):
+        try:
+            return func()
+        except OperationalError as exc:
+            if 'locked' not in str(exc) or attempt == LOCK_RETRIES - 1:
+                raise
+            time.sleep(0.01 * 2 ** attempt)
+
+
+def claim(limit):
+    """Mark up to ``limit`` due jobs RUNNING and return their ids.
+
+    Rows are locked with SKIP LOCKED, so concurrent workers never claim the
+    same job and never wait on each other.
+    """
+    return _retry_on_lock(lambda: _claim(limit))
+
+
+def _claim(limit):
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.Status.QUEUED, run_after__lte=now)
+            .order_by('run_after')
+            .values_list('id', flat=True)[:limit]
+        )
+        if ids:
+            Job.objects.filter(id__in=ids).update(
+                status=Job.Status.RUNNING, started_at=now, attempts=F('attempts') + 1)
+    return ids
+
+
+def requeue_stale(timeout):
+    """Put back jobs whose worker died mid-run (RUNNING for longer than ``timeout`` seconds)."""
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return Job.objects.filter(status=Job.Status.RUNNING, started_at__lt=cutoff).update(
+        status=Job.Status.QUEUED, run_after=timezone.now())
+
+
+def run(job_id):
+    """Run a claimed job and record the outcome. Returns the final status."""
+    job = _retry_on_lock(lambda: Job.objects.select_related('user').get(id=job_id))
+    try:
+        result = registry[job.name](job)
+    except Exception:
+        job.error = traceback.format_exc(limit=5)
+        job.finished_at = timezone.now()
+        if job.attempts < job.max_attempts:
+            job.status = Job.Status.QUEUED
+            job.run_after = job.finished_at + retry_delay(job.attempts)
+        else:
+            job.status = Job.Status.FAILED
+    else:
+        job.status = Job.Status.SUCCEEDED
+        job.result = result
+        job.error = ''
+        job.finished_at = timezone.now()
+    _retry_on_lock(lambda: job.save(update_fields=['status', 'result', 'error', 'run_after', 'finished_at']))
+    return job.status
+
+
+_inherited_connections = []
+
+
+def forget_inherited_connections():
+    """Process pool initializer: drop the database connections copied from the parent by fork.
+
+    They are discarded, not closed: closing would end the parent's session
+    over the shared socket. The worker opens its own on first use.
+    """
+    for conn in connections.all(initialized_only=True):
+        if conn.connection is not None:
+            # Keep a reference: a garbage-collected psycopg2 connection closes itself.
+            _inherited_connections.append(conn.connection)
+            conn.connection = None
+
+
+def run_in_worker(job_id):
+    """Entry point for pool workers, which own their database connection."""
+    try:
+        return run(job_id)
+    finally:
+        connection.close()
+
+
+def work_off(limit=100):
+    """Claim and run due jobs in the current thread until none are left or ``limit`` is hit."""
+    done = []
+    while len(done) < limit:
+        ids = claim(min(10, limit - len(done)))
+        if not ids:
+            break
+        done.extend(run(job_id) for job_id in ids)
+    return done
@@ -0,0 +1,9 @@
+from rest_framework import serializers
+from jobs.models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        exclude = ['user', 'payload']
+        read_only_fields = ['id']
@@ -0,0 +1,149 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import User
+from jobs import queue
+from jobs.models import Job
+
+
+calls = []
+
+
+@queue.job('test_echo')
+def echo(job):
+    calls.append(job.payload)
+    return {'echo': job.payload.get('value')}
+
+
+@queue.job('test_fail')
+def fail(job):
+    raise RuntimeError('boom')
+
+
+def connection_inherited():
+    return connection.connection is not None
+
+
+class TestJobQueue(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_work_off_runs_job_and_stores_result(self):
+        job = queue.enqueue('test_echo', {'value': 42})
+        self.assertEqual(queue.work_off(), [Job.Status.SUCCEEDED])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertEqual(job.result, {'echo': 42})
+        self.assertEqual(job.attempts, 1)
+
+    def test_failed_job_retries_with_backoff(self):
+        job = queue.enqueue('test_fail', max_attempts=2)
+        queue.work_off()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertIn('boom', job.error)
+        self.assertGreater(job.run_after, timezone.now())
+
+        # Not due yet, so nothing is claimed.
+        self.assertEqual(queue.claim(10), [])
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        queue.work_off()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_retry_delay_doubles_and_caps(self):
+        with self.settings(JOB_RETRY_BASE_DELAY=10, JOB_RETRY_MAX_DELAY=30):
+            self.assertEqual(queue.retry_delay(1), timedelta(seconds=10))
+            self.assertEqual(queue.retry_delay(2), timedelta(seconds=20))
+            self.assertEqual(queue.retry_delay(5), timedelta(seconds=30))
+
+    def test_claim_marks_running_once(self):
+        job = queue.enqueue('test_echo')
+        self.assertEqual(queue.claim(10), [job.id])
+        self.assertEqual(queue.claim(10), [])
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.Status.RUNNING)
+
+    def test_requeue_stale(self):
+        job = queue.enqueue('test_echo')
+        queue.claim(1)
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(queue.requeue_stale(60), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.Status.QUEUED)
+
+    def test_enqueue_unknown_job(self):
+        with self.assertRaises(KeyError):
+            queue.enqueue('missing')
+
+
+class TestRunJobsCommand(TransactionTestCase):
+    def test_burst_drains_queue_on_thread_pool(self):
+        for value in range(5):
+            queue.enqueue('test_echo', {'value': value})
+        out = StringIO()
+        call_command('run_jobs', '--burst', '--concurrency', '2', stdout=out)
+        self.assertIn('Processed 5 job(s)', out.getvalue())
+        self.assertEqual(Job.objects.filter(status=Job.Status.SUCCEEDED).count(), 5)
+
+    def test_forked_workers_drop_parent_connection(self):
+        connection.ensure_connection()
+        fork = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(1, mp_context=fork) as pool:
+            self.assertTrue(pool.submit(connection_inherited).result())
+        with ProcessPoolExecutor(1, mp_context=fork, initializer=queue.forget_inherited_connections) as pool:
+            self.assertFalse(pool.submit(connection_inherited).result())
+
+    def test_burst_on_process_pool_keeps_parent_connection(self):
+        for value in range(3):
+            queue.enqueue('test_echo', {'value': value})
+        out = StringIO()
+        call_command('run_jobs', '--burst', '--mode', 'process', '--concurrency', '2', stdout=out)
+        # Children write to their own copy of the in-memory test database, so
+        # only the reported outcome is checked here, plus that the parent's
+        # session survived the children closing theirs.
+        self.assertIn('Processed 3 job(s)', out.getvalue())
+        self.assertIn('succeeded=3', out.getvalue())
+        self.assertEqual(Job.objects.count(), 3)
+
+
+class TestJobAPI(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='job_user', password='userpass')
+        self.other = User.objects.create_user(username='other_user', password='userpass')
+        self.job = queue.enqueue('test_echo', user=self.user)
+        queue.enqueue('test_echo', user=self.other)
+
+    def test_status_polling_is_scoped_to_owner(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('job-detail', kwargs={'pk': self.job.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], Job.Status.QUEUED)
+        self.assertEqual(len(self.client.get(reverse('job-list')).data), 1)
+
+        self.client.force_authenticate(self.other)
+        response = self.client.get(reverse('job-detail', kwargs={'pk': self.job.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_metrics_staff_only(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(reverse('job-metrics')).status_code, status.HTTP_403_FORBIDDEN)
+
+        queue.work_off()
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('job-metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['counts']['SUCCEEDED'], 2)
+        self.assertEqual(response.data['throughput_per_min']['1m'], 2)
+        self.assertIsNotNone(response.data['avg_run_sec'])
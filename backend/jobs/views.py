@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from django.db.models import Avg, Count, F, Min, Q
+from django.utils import timezone
+from rest_framework import permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from jobs.models import Job
+from jobs.serializers import JobSerializer
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status polling for the current user's background jobs."""
+    serializer_class = JobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        qs = Job.objects.filter(user=self.request.user)
+        job_status = self.request.query_params.get('status')
+        if job_status:
+            qs = qs.filter(status=job_status)
+        return qs.order_by('-created_at')
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def metrics(self, request):
+        now = timezone.now()
+        windows = {'1m': 1, '5m': 5, '60m': 60}
+        stats = Job.objects.aggregate(
+            **{status.lower(): Count('id', filter=Q(status=status)) for status in Job.Status.values},
+            **{
+                f'finished_{label}': Count('id', filter=Q(finished_at__gte=now - timedelta(minutes=minutes),
+                                                          status=Job.Status.SUCCEEDED))
+                for label, minutes in windows.items()
+            },
+            oldest_queued=Min('run_after', filter=Q(status=Job.Status.QUEUED, run_after__lte=now)),
+            avg_run=Avg(F('finished_at') - F('started_at'), filter=Q(
+                status=Job.Status.SUCCEEDED, finished_at__gte=now - timedelta(hours=1))),
+        )
+        oldest_queued = stats.pop('oldest_queued')
+        avg_run = stats.pop('avg_run')
+        return Response({
+            'counts': {status: stats.pop(status.lower()) for status in Job.Status.values},
+            'throughput_per_min': {
+                label: stats[f'finished_{label}'] / minutes for label, minutes in windows.items()
+            },
+            'queue_lag_sec': (now - oldest_queued).total_seconds() if oldest_queued else 0,
+            'avg_run_sec': avg_run.total_seconds() if avg_run else None,
+        })
@@ -51,7 +51,7 @@ if DEBUG:
     CORS_ALLOW_ALL_ORIGINS = True
 
 # Разрешённые методы/заголовки для preflight (обычно по умолчанию хватает)
-CORS_ALLOW_HEADERS = ['authorization', 'content-type']
+CORS_ALLOW_HEADERS = ['authorization', 'content-type', 'idempotency-key']
 CORS_ALLOW_METHODS = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS']
 
 # Application definition
@@ -64,6 +64,8 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'api',
+    'ai_agent',
+    'jobs',
     'corsheaders',
     'rest_framework',
     'rest_framework_simplejwt',
@@ -107,8 +109,23 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # Token buckets for expensive routes, see api/throttling.py
+    'DEFAULT_THROTTLE_RATES': {
+        'generate': os.getenv('THROTTLE_GENERATE', '5/min'),
+        'login': os.getenv('THROTTLE_LOGIN', '10/min'),
+        'registration': os.getenv('THROTTLE_REGISTRATION', '5/min'),
+    },
+    # Reverse proxies in front of the app. Per-IP throttles trust only the
+    # X-Forwarded-For entry added by the nearest of them; with 0 the header is
+    # ignored and REMOTE_ADDR is used, so clients can't pick their own bucket.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '0')),
 }
 
+# 'memory' keeps buckets per worker; 'cache' shares them through RATE_LIMIT_CACHE,
+# which must then be a cache all workers see (e.g. DatabaseCache or Memcached)
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_CACHE = os.getenv('RATE_LIMIT_CACHE', 'default')
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
@@ -176,6 +193,45 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Background job queue (jobs app), worked off by `manage.py run_jobs`
+JOB_WORKER_CONCURRENCY = int(os.getenv('JOB_WORKER_CONCURRENCY', '4'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_RETRY_BASE_DELAY = 10  # seconds, doubled on every retry
+JOB_RETRY_MAX_DELAY = 3600
+JOB_TIMEOUT = int(os.getenv('JOB_TIMEOUT', '900'))  # RUNNING longer than this is requeued
+
+# Slot push channel (GET /api/slots/events/, needs the ASGI app).
+# With REALTIME_PG_NOTIFY every worker relays events through Postgres LISTEN/NOTIFY.
+REALTIME_PG_NOTIFY = os.getenv('REALTIME_PG_NOTIFY', 'False').lower() == 'true'
+REALTIME_TICK_SEC = 1
+REALTIME_KEEPALIVE_SEC = 15
+# PLANNED slots this long past their scheduled time are swept to MISSED
+SLOT_MISSED_AFTER_SEC = int(os.getenv('SLOT_MISSED_AFTER_SEC', '7200'))
+
+# Jaccard similarity (api/similarity.py) above which a new practice is flagged
+# as a near-duplicate, and above which a generation prompt reuses an earlier result
+PRACTICE_DUPLICATE_THRESHOLD = 0.8
+PROMPT_REUSE_THRESHOLD = 0.75
+
+# Ratings younger than this are left for the next cohort summary refresh
+COHORT_REFRESH_LAG = 60
+
+# Stored responses for Idempotency-Key retries (api/idempotency.py)
+IDEMPOTENCY_KEY_TTL = 24 * 3600
+IDEMPOTENCY_WAIT_SEC = 30  # how long a duplicate waits for the in-flight original
+# An IN_FLIGHT key older than this is treated as abandoned (worker killed) and
+# taken over by the next retry; keep it above the server's request timeout.
+IDEMPOTENCY_IN_FLIGHT_TIMEOUT = int(os.getenv('IDEMPOTENCY_IN_FLIGHT_TIMEOUT', '300'))
+
+# Upper bound on points per series returned by /api/ratings/trend/
+TREND_MAX_POINTS = 500
+
+# Threads that build avatar thumbnails, see api/avatars.py
+AVATAR_WORKERS = int(os.getenv('AVATAR_WORKERS', '2'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 